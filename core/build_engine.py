@@ -1,9 +1,9 @@
 import os
+import sys
 import json
-import time
 import re
-import urllib.request
 import ssl
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # ==========================================
@@ -18,6 +18,14 @@ OUTPUT_DIR = CMS_ROOT  # Root of the site
 CONFIG_PATH = os.path.join(DATA_DIR, 'config.json')
 TEMPLATE_PATH = os.path.join(ASSETS_DIR, 'master_template.html')
 LEAGUE_MAP_PATH = os.path.join(ASSETS_DIR, 'data', 'league_map.json')
+IMAGE_MAP_PATH = os.path.join(ASSETS_DIR, 'data', 'image_map.json')
+MAPS_DIR = os.path.join(ASSETS_DIR, 'data', 'maps')
+MANIFEST_PATH = os.path.join(ASSETS_DIR, 'data', 'build_manifest.json')
+FEED_CACHE_DIR = os.path.join(ASSETS_DIR, 'data', 'cache', 'feed')
+SNAPSHOT_PATH = os.path.join(ASSETS_DIR, 'data', 'matches.json')
+
+# Shared modules the index output depends on (scripts/): part of its fingerprint
+RENDERER_MODULES = ('asset_cache.py', 'html_minify.py', 'map_assets.py')
 
 # Output Files
 INDEX_PATH = os.path.join(OUTPUT_DIR, 'index.html')
@@ -27,28 +35,34 @@ WATCH_DIR = os.path.join(OUTPUT_DIR, 'watch')
 DEFAULT_API_URL = "https://vercelapi-olive.vercel.app/api/sync-nodes?country=us"
 API_URL = DEFAULT_API_URL  # Will be overwritten by config
 
-# Image Directories
-TSDB_DIR = os.path.join(ASSETS_DIR, "logos", "tsdb")
-STREAMED_DIR = os.path.join(ASSETS_DIR, "logos", "streamed")
-LEAGUE_DIR = os.path.join(ASSETS_DIR, "logos", "leagues")
+# Logo store kinds (content-addressed, keys are "<kind>/<slug>")
+STREAMED_KIND = "streamed"
+LEAGUE_KIND = "leagues"
 STREAMED_HASH_BASE = "https://streamed.pk/api/images/badge/"
 
+# Image Sync (parallel, keep-alive per host, throttled per host)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_SYNC_WORKERS', 8))
+IMAGE_HOST_RATE = float(os.environ.get('IMAGE_SYNC_HOST_RATE', 10))  # Requests/second per host
+IMAGE_MAX_AGE_DAYS = 60
+
 # SSL Context
 SSL_CONTEXT = ssl._create_unverified_context()
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-# League Whitelist for Cleaning
-ALLOWED_LEAGUES_INPUT = """
-NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball, 
-NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League, 
-Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American-Football, American Football, 
-Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership, 
-Europa League, Europa-League, A League, A-League, A League Men, A League Women, 
-Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
-"""
-VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
+# Shared build helpers live next to build_site.py
+sys.path.insert(0, os.path.join(CMS_ROOT, 'scripts'))
+import asset_cache
+import html_minify
+import instrument
+from build_manifest import BuildManifest, fingerprint, hash_file, write_if_changed
+from map_assets import publish_image_map
+from http_pool import HttpPool
+from logo_store import LogoStore
+from normalize import clean_display_name
+from feed_client import fetch_matches
+import match_snapshot
 
 
 # ==========================================
@@ -78,96 +92,79 @@ def slugify(text):
     return text.strip('-')
 
 # --- IMAGE DOWNLOADER UTILS ---
-def clean_display_name(name):
-    if not name: return None
-    # Rule 1: Colon
-    if ':' in name:
-        parts = name.split(':', 1)
-        if len(parts) > 1:
-            cleaned = parts[1].strip()
-            if cleaned and len(cleaned) > 1:
-                return cleaned
-    # Rule 2: Whitelist
-    lower_name = name.lower()
-    for league in VALID_LEAGUES:
-        if lower_name.startswith(league):
-            remainder = name[len(league):]
-            clean_remainder = re.sub(r"^[\s-]+", "", remainder)
-            if clean_remainder and len(clean_remainder.strip()) > 1:
-                return clean_remainder.strip()
-    return name.strip()
-
 def resolve_url(source_val):
     if not source_val: return None
     if source_val.startswith("http"): return source_val
     return f"{STREAMED_HASH_BASE}{source_val}.webp"
 
-def download_file(url, save_path):
-    # Simple check: 60 days
-    if os.path.exists(save_path):
-        age = (time.time() - os.path.getmtime(save_path)) / (24 * 3600)
-        if age < 60: return False # Skip if fresh
 
-    try:
-        req = urllib.request.Request(url, headers=HEADERS)
-        with urllib.request.urlopen(req, context=SSL_CONTEXT, timeout=8) as response:
-            if response.status == 200:
-                data = response.read()
-                with open(save_path, "wb") as f:
-                    f.write(data)
-                return True
-    except:
-        pass
-    return False
+def image_urls(img_obj):
+    if isinstance(img_obj, dict): return list(img_obj.values())
+    if isinstance(img_obj, list): return img_obj
+    if isinstance(img_obj, str): return [img_obj]
+    return []
+
+def collect_image_jobs(matches):
+    """
+    {store_key: [candidate urls]} for every badge in the feed.
+    A team/league appearing in many matches becomes ONE job; its candidate
+    URLs from every match are kept (in order) as fallbacks.
+    """
+    jobs = {}
+    def add(key, img_obj):
+        urls = jobs.setdefault(key, [])
+        for u in image_urls(img_obj):
+            final_url = resolve_url(u)
+            if final_url and final_url not in urls: urls.append(final_url)
 
-def sync_images(matches):
-    print("--- 🖼️ Starting Image Sync ---")
-    os.makedirs(STREAMED_DIR, exist_ok=True)
-    os.makedirs(LEAGUE_DIR, exist_ok=True)
-    
-    count = 0
     for m in matches:
         # Teams
         for raw_name, img_obj in [(m.get('home_team'), m.get('home_team_image')), 
                                   (m.get('away_team'), m.get('away_team_image'))]:
-            name = clean_display_name(raw_name)
-            slug = slugify(name)
-            if not slug: continue
-            
-            # Save Path
-            path = os.path.join(STREAMED_DIR, f"{slug}.webp")
-            
-            # Get URL list
-            urls = []
-            if isinstance(img_obj, dict): urls = list(img_obj.values())
-            elif isinstance(img_obj, list): urls = img_obj
-            elif isinstance(img_obj, str): urls = [img_obj]
-            
-            # Download first valid
-            for u in urls:
-                final_url = resolve_url(u)
-                if final_url and download_file(final_url, path):
-                    count += 1
-                    break
-        
+            slug = slugify(clean_display_name(raw_name))
+            if slug: add(f"{STREAMED_KIND}/{slug}", img_obj)
+
         # League
         l_raw = m.get('league')
         l_imgs = m.get('league_image')
         if l_raw and l_imgs:
             l_slug = slugify(l_raw)
-            if l_slug:
-                 path = os.path.join(LEAGUE_DIR, f"{l_slug}.webp")
-                 urls = []
-                 if isinstance(l_imgs, dict): urls = list(l_imgs.values())
-                 elif isinstance(l_imgs, list): urls = l_imgs
-                 elif isinstance(l_imgs, str): urls = [l_imgs]
-                 
-                 for u in urls:
-                    final_url = resolve_url(u)
-                    if final_url and download_file(final_url, path):
-                        count += 1
-                        break
-                        
+            if l_slug: add(f"{LEAGUE_KIND}/{l_slug}", l_imgs)
+    return jobs
+
+def download_file(pool, urls, key, store):
+    """
+    Stores the first URL that answers 200. True if a logo was saved.
+    """
+    for url in urls:
+        try:
+            status, _, data = pool.get(url)
+        except Exception:
+            continue
+        if status == 200:
+            store.put(key, data)
+            return True
+    return False
+
+def sync_images(matches, workers=IMAGE_WORKERS):
+    print("--- 🖼️ Starting Image Sync ---")
+    store = LogoStore(CMS_ROOT)
+    jobs = collect_image_jobs(matches)
+    # Simple check: 60 days
+    todo = [(key, urls) for key, urls in jobs.items() if urls and store.should_download(key, IMAGE_MAX_AGE_DAYS)]
+    print(f"   {len(jobs)} unique badges, {len(todo)} to fetch ({workers} workers)")
+
+    count = 0
+    if todo:
+        pool = HttpPool(headers=HEADERS, timeout=8, rate=IMAGE_HOST_RATE, context=SSL_CONTEXT)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                count = sum(ex.map(lambda job: download_file(pool, job[1], job[0], store), todo))
+        finally:
+            pool.close()
+            store.save()
+        print(f"   {pool.stats['requests']} requests over {pool.stats['connections']} connections")
+
     print(f"✅ Images Synced: {count} new/updated files.")
 
 
@@ -176,23 +173,16 @@ def sync_images(matches):
 # ==========================================
 def fetch_live_data(api_url):
     print(f"🌍 Fetching Data from {api_url}...")
-    try:
-        req = urllib.request.Request(api_url, headers=HEADERS)
-        with urllib.request.urlopen(req, context=SSL_CONTEXT, timeout=15) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode('utf-8'))
-                return data.get('matches', [])
-            else:
-                print(f"❌ API Error: {response.status}")
-                return []
-    except Exception as e:
-        print(f"❌ Connection Failed: {e}")
-        return []
+    # Shared with the fetchers: conditional GET, on-disk copy as stale fallback
+    # Returns (matches, source): see feed_client.fetch_feed()
+    return fetch_matches(api_url, with_source=True, cache_dir=FEED_CACHE_DIR, context=SSL_CONTEXT,
+                         snapshot_path=SNAPSHOT_PATH)
 
-def inject_variables(html, config, title=None, is_home=False):
+def inject_variables(html, config, title=None, is_home=False, compact=False):
     """
     Robust injection of variables into the template.
     Refactored to avoid regex stripping of un-replaced variables.
+    compact: serialise the injected JSON without separator spaces (--minify).
     """
     settings = config.get('site_settings', {})
     theme = config.get('theme', {})
@@ -202,6 +192,8 @@ def inject_variables(html, config, title=None, is_home=False):
         '{{SITE_NAME}}': f"{settings.get('title_part_1','Stream')}{settings.get('title_part_2','East')}",
         '{{API_URL}}': settings.get('api_url', DEFAULT_API_URL),
         '{{TARGET_COUNTRY}}': settings.get('target_country', 'US'),
+        '{{MATCH_SNAPSHOT_URL}}': match_snapshot.SNAPSHOT_URL,
+        '{{JS_LIVE_REFRESH}}': match_snapshot.live_refresh_seconds(settings),
         '{{PARAM_LIVE}}': settings.get('param_live', 'stream'),
         '{{PARAM_INFO}}': settings.get('param_info', 'livestream'),
         '{{SITE_DOMAIN}}': settings.get('domain', ''), 
@@ -242,16 +234,20 @@ def inject_variables(html, config, title=None, is_home=False):
         html = html.replace(tag, str(value))
 
     # 2. JSON Objects (Safe Injection)
-    # JS Priorities
-    priorities = config.get('sport_priorities', {})
-    html = html.replace('{{JS_PRIORITIES}}', json.dumps(priorities))
+    # JS Priorities (per target country, same table the match snapshot is scored with)
+    priorities = config.get('sport_priorities', {}).get(settings.get('target_country', 'US'), {})
+    html = html.replace('{{JS_PRIORITIES}}', html_minify.dumps(priorities, compact))
     
     # JS Theme Config
-    html = html.replace('{{JS_THEME_CONFIG}}', json.dumps(theme))
+    html = html.replace('{{JS_THEME_CONFIG}}', html_minify.dumps(theme, compact))
     
-    # League Map
-    league_map = load_json(LEAGUE_MAP_PATH)
-    html = html.replace('{{JS_LEAGUE_MAP}}', json.dumps(league_map))
+    # League Map (parsed + serialised once, reused across calls)
+    html = html.replace('{{JS_LEAGUE_MAP}}', asset_cache.data_json(LEAGUE_MAP_PATH, compact))
+
+    # Image Map (external, content-hashed file; the page only gets the pointer)
+    image_map_src = publish_image_map(asset_cache.load_data(IMAGE_MAP_PATH), out_dir=MAPS_DIR)
+    html = html.replace('{{JS_IMAGE_MAP}}', html_minify.dumps({"teams": {}, "leagues": {}}, compact))
+    html = html.replace('{{JS_IMAGE_MAP_SRC}}', html_minify.dumps(image_map_src, compact))
 
     # 3. Clean remaining tags (CAREFULLY)
     # Only remove Uppercase tags that look like {{TAG}}
@@ -262,7 +258,14 @@ def inject_variables(html, config, title=None, is_home=False):
 # ==========================================
 # 4. MAIN BUILD
 # ==========================================
-def main():
+def owned_by_build_site(config):
+    """
+    True if build_site.py renders index.html (the config has a page with slug "home").
+    """
+    return any(p.get('slug') == 'home' for p in config.get('pages', []))
+
+
+def main(force=False, image_workers=IMAGE_WORKERS, minify=False):
     print("--- 🚀 Starting Build Engine ---")
     
     # 1. Load Config
@@ -271,17 +274,40 @@ def main():
         print("⚠️ Config missing/empty. Using defaults.")
         config = {} # fallback
         
-    api_url = config.get('site_settings', {}).get('api_url', DEFAULT_API_URL)
+    settings = config.get('site_settings', {})
+    country = settings.get('target_country', 'US')
+    api_url = match_snapshot.feed_url(settings.get('api_url', DEFAULT_API_URL), country)
     
     # 2. Fetch Data
-    matches = fetch_live_data(api_url)
+    instrument.mark('fetch')
+    matches, source = fetch_live_data(api_url)
     if not matches:
         print("⚠️ No match data found. Generating empty index.")
     
     # 3. Download Images (Merged Step)
-    sync_images(matches)
+    instrument.mark('images')
+    sync_images(matches, workers=image_workers)
+
+    # 3b. Match Snapshot (pages render from it instead of calling the API)
+    instrument.mark('snapshot')
+    if matches:
+        snapshot = match_snapshot.build_snapshot(matches, asset_cache.reverse_league_map(LEAGUE_MAP_PATH),
+                                                 config.get('sport_priorities', {}).get(country, {}))
+        # Only a current read of the feed may mark the snapshot fresh (not a stale copy / the snapshot itself)
+        checked = source in ('network', 'not-modified', 'cache')
+        if match_snapshot.write_snapshot(snapshot, SNAPSHOT_PATH, checked=checked):
+            print(f"📸 Snapshot: {len(snapshot['matches'])} matches -> {match_snapshot.SNAPSHOT_URL}")
+        else:
+            print("⏭️ Snapshot matches unchanged" + (" (generated_at refreshed)." if checked else "."))
     
     # 4. Load Template
+    instrument.mark('index')
+    # With a "home" page in the config, index.html belongs to build_site.py:
+    # writing it here too would flip it between the two renders every run.
+    if owned_by_build_site(config):
+        print("⏭️ Index is the CMS home page (scripts/build_site.py). Skipping.")
+        print("--- ✅ Build Complete ---")
+        return
     if not os.path.exists(TEMPLATE_PATH):
         print("❌ Master Template Not Found!")
         return
@@ -289,12 +315,44 @@ def main():
     with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
         template_html = f.read()
 
-    # 5. Generate Index
-    print("🔨 Generating Index...")
-    final_html = inject_variables(template_html, config, is_home=True)
-    save_file(INDEX_PATH, final_html)
+    # 5. Generate Index (skipped when its inputs are unchanged since the last build)
+    manifest = BuildManifest(MANIFEST_PATH, root=OUTPUT_DIR, force=force)
+    inputs = fingerprint(
+        [hash_file(p) for p in [os.path.abspath(__file__)] + [os.path.join(CMS_ROOT, 'scripts', name) for name in RENDERER_MODULES]],
+        template_html,
+        {k: config.get(k) for k in ['site_settings', 'theme', 'sport_priorities']},
+        hash_file(LEAGUE_MAP_PATH),
+        hash_file(IMAGE_MAP_PATH),
+        minify,
+    )
+    if manifest.is_fresh(INDEX_PATH, inputs):
+        print("⏭️ Index unchanged. Skipping.")
+        manifest.skip(INDEX_PATH)
+    else:
+        print("🔨 Generating Index...")
+        final_html = inject_variables(template_html, config, is_home=True, compact=minify)
+        if minify:
+            rendered = len(final_html.encode('utf-8'))
+            final_html, ok = html_minify.minify_page(final_html)
+            if ok: print(f"🧹 Minify: {rendered / 1024:.1f} KB -> {len(final_html.encode('utf-8')) / 1024:.1f} KB")
+            else: print("⚠️ Minify changed a script. Index written unminified.")
+        output_hash, written = write_if_changed(INDEX_PATH, final_html)
+        manifest.record(INDEX_PATH, inputs, output_hash, written)
+        instrument.add('pages_rendered')
+        if written: instrument.add('bytes_written', len(final_html.encode('utf-8')))
+        if written: print(f"💾 Saved: {os.path.basename(INDEX_PATH)}")
+    manifest.save()
+    manifest.report()
     
     print("--- ✅ Build Complete ---")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Fetch live data, sync badges and build the index")
+    parser.add_argument('--force', action='store_true', help="Ignore the build manifest and rebuild the index")
+    parser.add_argument('--image-workers', type=int, default=IMAGE_WORKERS, help="Parallel badge downloads (env IMAGE_SYNC_WORKERS)")
+    parser.add_argument('--minify', action='store_true', help="Strip comments / collapse whitespace / compact JSON in the index")
+    args = parser.parse_args()
+    instrument.start('build_engine')
+    main(force=args.force, image_workers=args.image_workers, minify=args.minify)
+    instrument.finish()
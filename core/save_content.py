@@ -11,6 +11,10 @@ import datetime
 
 REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Staging goes by the build manifest's pending list (scripts/git_stage.py)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+import git_stage
+
 def run_git_command(args, cwd=REPO_ROOT):
     try:
         result = subprocess.run(
@@ -40,14 +44,22 @@ def main():
         print("   -> Pull failed. Attempting standard pull...")
         run_git_command(['pull', 'origin', 'main'])
 
-    # 2. Add Changes
+    # 2. Add Changes (only the files the builds changed since the last sync)
     print("2. Staging local changes...")
-    run_git_command(['add', '.'])
+    try:
+        git_stage.stage_changes('git', REPO_ROOT, log=lambda line: print(f"   {line}"))
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️ Git Error (staging): {e.stderr.strip()}")
 
     # 3. Commit
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"3. Committing updates ({timestamp})...")
-    run_git_command(['commit', '-m', f"Admin Panel Update: {timestamp}"])
+    if git_stage.has_staged_changes('git', REPO_ROOT):
+        success, output = run_git_command(['commit', '-m', f"Admin Panel Update: {timestamp}"])
+    else:
+        print("   -> Nothing new to commit.")
+        success = True
+    if success: git_stage.mark_deployed(REPO_ROOT)
 
     # 4. Push
     print("4. Pushing to remote...")
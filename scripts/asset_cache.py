@@ -0,0 +1,91 @@
+import json
+import os
+
+from map_assets import slugify
+
+# ==========================================
+# BUILD-SCOPED ASSET CACHE
+# ==========================================
+# league_map.json / image_map.json are identical for every page of a build.
+# Parse (and serialise) them once; entries are keyed on the file's
+# mtime + size, so a long-running process (CMS server) picks up edits
+# without a restart.
+_cache = {}
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached(kind, path, builder):
+    key = (kind, os.path.abspath(path))
+    stamp = _stamp(path)
+    hit = _cache.get(key)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    value = builder()
+    _cache[key] = (stamp, value)
+    return value
+
+
+def _read_json(path):
+    if not os.path.exists(path): return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"⚠️ Warning: {path} contains invalid JSON. Returning empty dict.")
+        return {}
+
+
+def load_data(path):
+    """
+    Parsed JSON for `path` ({} if missing/invalid). Treat as read-only: it is shared.
+    """
+    return _cached('json', path, lambda: _read_json(path))
+
+
+def reverse_league_map(path):
+    """
+    League map flipped to team -> league (last league wins, like the frontend expects).
+    """
+    def build():
+        reverse_map = {}
+        for league_name, teams in load_data(path).items():
+            for team in teams:
+                reverse_map[team] = league_name
+        return reverse_map
+    return _cached('reverse', path, build)
+
+
+def team_slug_index(path):
+    """
+    image_map.json team names grouped by slugify(name), the league map's key format.
+    """
+    def build():
+        index = {}
+        for name in load_data(path).get('teams', {}):
+            index.setdefault(slugify(name), []).append(name)
+        return index
+    return _cached('team_slugs', path, build)
+
+
+def data_json(path, compact=False):
+    """
+    json.dumps() of the file's parsed content, serialised once (compact: no separator spaces).
+    """
+    if compact: return _cached('dumps_compact', path, lambda: json.dumps(load_data(path), separators=(',', ':')))
+    return _cached('dumps', path, lambda: json.dumps(load_data(path)))
+
+
+def reverse_league_map_json(path, compact=False):
+    if compact: return _cached('reverse_dumps_compact', path, lambda: json.dumps(reverse_league_map(path), separators=(',', ':')))
+    return _cached('reverse_dumps', path, lambda: json.dumps(reverse_league_map(path)))
+
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,340 @@
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import asset_cache
+import build_site
+import feed_client
+import generate_map
+import match_snapshot
+from fuzzy_index import FuzzyIndex
+from logo_store import LogoStore
+from map_assets import publish_image_map, publish_league_map, slugify
+from normalize import clean_display_name
+
+# ==========================================
+# OFFLINE BENCHMARK SUITE
+# ==========================================
+# python scripts/benchmark.py [--sizes 1000,10000,50000] [--pages 20]
+#     [--leagues 40] [--logos 3000] [--max-match-pages 2000] [--compare FILE]
+#
+# For each feed size it builds a throwaway site in a temp dir:
+#   - a synthetic feed, seeded into the feed cache so nothing touches the
+#     network;
+#   - data/config.json (this repo's config plus N custom pages and M linked
+#     leagues in sport_priorities);
+#   - league / image maps and a logo store of the requested size.
+# Team and league names are sampled from _debug/raw_fetch.json (the real
+# payload), then varied, so name cleaning and fuzzy matching see realistic
+# input.
+#
+# It then times clean_display_name, FuzzyIndex, build_snapshot,
+# generate_map, render_page (per template) and build_site (full and no-op).
+# Results go to _debug/bench/<time>-<commit>.json, and are compared with
+# the previous result file (or --compare FILE).
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(REPO, '_debug', 'bench')
+REAL_FEED = os.path.join(REPO, '_debug', 'raw_fetch.json')
+BASE_CONFIG = os.path.join(REPO, 'data', 'config.json')
+TEMPLATES = ['master_template.html', 'watch_template.html', 'league_template.html', 'page_template.html']
+FEED_URL = generate_map.BACKEND_URL
+SEED = 42
+
+FALLBACK_TEAMS = ['Manchester City', 'Arsenal', 'Boston Bruins', 'Los Angeles Lakers', 'Real Madrid', 'Bayern Munich']
+FALLBACK_LEAGUES = [('Premier League', 'Soccer'), ('NBA', 'Basketball'), ('NHL', 'Ice Hockey'), ('La Liga', 'Soccer')]
+SUFFIXES = ['', '', '', ' FC', ' U21', ' Women', ' II', ' Reserves']
+PREFIXES = ['', '', '', 'NBA: ', 'Premier League - ', 'A League Men - ', 'UFC: ']
+
+
+# ==========================================
+# 1. SYNTHETIC INPUTS
+# ==========================================
+def real_names():
+    """
+    (teams, [(league, sport)]) from the real feed snapshot, or a small built-in list.
+    """
+    try:
+        with open(REAL_FEED, 'r', encoding='utf-8') as f:
+            matches = json.load(f).get('matches', [])
+    except (OSError, json.JSONDecodeError):
+        matches = []
+    teams = sorted({t for m in matches for t in (m.get('home_team'), m.get('away_team')) if t and t != 'TBA'})
+    leagues = sorted({(m['league'], m.get('sport') or 'General') for m in matches if m.get('league')})
+    return teams or FALLBACK_TEAMS, leagues or FALLBACK_LEAGUES
+
+
+def make_feed(n, teams, leagues, seed=SEED):
+    """
+    Sync-nodes style payload with `n` matches over a team pool of max(200, n / 5).
+    """
+    rnd = random.Random(seed)
+    pool = [rnd.choice(PREFIXES) + rnd.choice(teams) + rnd.choice(SUFFIXES) for _ in range(max(200, n // 5))]
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    matches = []
+    for i in range(n):
+        league, sport = rnd.choice(leagues)
+        home, away = rnd.sample(pool, 2)
+        live = rnd.random() < 0.2
+        start = now + timedelta(minutes=rnd.randint(-120, 7 * 24 * 60))
+        matches.append({
+            'id': f"bench-{i}",
+            'timestamp': start.isoformat().replace('+00:00', '.000Z'),
+            'sport': sport, 'league': league,
+            'home_team': home, 'away_team': away,
+            'home_team_image': {'streamed': f"h{i}"}, 'away_team_image': {'streamed': f"a{i}"},
+            'league_image': {'sport-tv-guide': f"https://img.example/leagues/{slugify(league)}.png"},
+            'is_live': live, 'live_viewers': rnd.randint(0, 5000) if live else 0,
+            'status_text': 'LIVE' if live else '',
+            'stream_channels': [{'name': 'Alpha', 'url': f"https://embed.example/{i}/1"},
+                                {'name': 'Bravo', 'url': f"https://embed.example/{i}/2"}],
+        })
+    return {'country': 'us', 'total_matches': n, 'matches': matches}
+
+
+def make_config(pages, leagues, league_names, seed=SEED):
+    """
+    This repo's config plus `pages` custom pages and `leagues` linked leagues.
+    """
+    try:
+        with open(BASE_CONFIG, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        config = {'site_settings': {'domain': 'example.com', 'target_country': 'US'}, 'pages': []}
+    rnd = random.Random(seed)
+    body = '\n'.join(f"<p>Paragraph {i} about live sports streaming schedules and coverage.</p>" for i in range(12))
+    config.setdefault('pages', [])
+    config['pages'] += [{'slug': f"bench-page-{i}", 'title': f"Bench Page {i}", 'layout': rnd.choice(['page', 'home']),
+                         'meta_title': f"Bench Page {i}", 'meta_desc': "Synthetic page", 'content': body}
+                        for i in range(pages)]
+    country = config.get('site_settings', {}).get('target_country', 'US')
+    priorities = config.setdefault('sport_priorities', {}).setdefault(country, {})
+    for i, name in enumerate(league_names[:leagues]):
+        priorities.setdefault(name, {'score': leagues - i, 'isLeague': True, 'hasLink': True, 'isHidden': False})
+    return config
+
+
+def make_site(root, n, args, teams, leagues):
+    """
+    Writes a complete, offline site tree for a feed of `n` matches under `root`.
+    Returns (feed, config).
+    """
+    feed = make_feed(n, teams, leagues)
+    config = make_config(args.pages, args.leagues, [name for name, _ in leagues])
+    for name in TEMPLATES:
+        src = os.path.join(REPO, 'assets', name)
+        if os.path.exists(src): shutil.copy(src, os.path.join(root, 'assets', name))
+    _write_json(os.path.join(root, build_site.CONFIG_PATH), config)
+
+    # League map: every team slug under the first league it plays in
+    league_map = {}
+    for m in feed['matches']:
+        for team in (m['home_team'], m['away_team']):
+            league_map.setdefault(m['league'], set()).add(slugify(clean_display_name(team)))
+    _write_json(os.path.join(root, build_site.LEAGUE_MAP_PATH), {k: sorted(v) for k, v in league_map.items()})
+
+    # Logo store: real-looking slugs (some match the feed exactly, the rest don't)
+    rnd = random.Random(SEED)
+    store = LogoStore(root)
+    slugs = {slugify(t) for t in teams}
+    while len(slugs) < args.logos:
+        slugs.add(slugify(rnd.choice(teams) + rnd.choice(SUFFIXES[3:]) + f" {rnd.randint(1, 99)}"))
+    for slug in sorted(slugs)[:args.logos]:
+        store.put(f"tsdb/{slug}", f"logo:{slug}".encode('utf-8'))
+    store.save()
+    image_map = {'teams': {generate_map.make_pretty_name(s): u for s, u in store.slugs('tsdb').items()}, 'leagues': {}}
+    _write_json(os.path.join(root, build_site.IMAGE_MAP_PATH), image_map)
+
+    feed_client.seed_cache(FEED_URL, feed, os.path.join(root, feed_client.CACHE_DIR))
+    return feed, config
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+# ==========================================
+# 2. TIMING
+# ==========================================
+def timed(fn, repeat=3, setup=None):
+    """
+    Wall times of `repeat` runs of fn() (stdout muted), each after setup().
+    """
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+    return times
+
+
+def result(name, size, items, times, **params):
+    best = min(times)
+    return {'bench': name, 'size': size, 'items': items, 'runs': len(times),
+            'min_s': round(best, 5), 'median_s': round(statistics.median(times), 5),
+            'per_item_us': round(best / max(items, 1) * 1e6, 2), **params}
+
+
+def bench_size(n, args, teams, leagues):
+    """
+    Every benchmark for one feed size, run inside a throwaway site tree.
+    """
+    out = []
+    root = tempfile.mkdtemp(prefix=f"bench-{n}-")
+    cwd = os.getcwd()
+    try:
+        os.makedirs(os.path.join(root, 'assets'), exist_ok=True)
+        feed, config = make_site(root, n, args, teams, leagues)
+        os.chdir(root)  # The pipeline scripts use paths relative to the site root
+        asset_cache.clear()
+        matches = feed['matches']
+        names = [m[k] for m in matches for k in ('home_team', 'away_team')]
+
+        # --- Name cleaning (cold cache every run) ---
+        t = timed(lambda: [clean_display_name(x) for x in names], args.repeat, setup=clean_display_name.cache_clear)
+        out.append(result('clean_display_name', n, len(names), t))
+
+        # --- Fuzzy matching: index build + best() for every distinct cleaned name ---
+        slugs = list(LogoStore().slugs('tsdb'))
+        queries = sorted({slugify(clean_display_name(x)) for x in names} - set(slugs))[:args.fuzzy_queries]
+        t = timed(lambda: [FuzzyIndex(slugs, generate_map.FUZZY_CUTOFF).best(q) for q in queries[:1]], args.repeat)
+        out.append(result('fuzzy_index_build', n, len(slugs), t))
+        index = FuzzyIndex(slugs, generate_map.FUZZY_CUTOFF)
+        t = timed(lambda: [index.best(q) for q in queries], args.repeat)
+        out.append(result('fuzzy_best', n, len(queries), t, slugs=len(slugs)))
+
+        # --- Match snapshot ---
+        team_to_league = asset_cache.reverse_league_map(build_site.LEAGUE_MAP_PATH)
+        priorities = config['sport_priorities'].get(config['site_settings'].get('target_country', 'US'), {})
+        t = timed(lambda: match_snapshot.build_snapshot(matches, team_to_league, priorities), args.repeat)
+        out.append(result('build_snapshot', n, len(matches), t))
+
+        # --- generate_map (cold fuzzy cache each run) ---
+        cache_file = os.path.join(root, 'assets', 'data', 'cache', 'fuzzy_matches.json')
+        t = timed(generate_map.main, 1, setup=lambda: os.path.exists(cache_file) and os.remove(cache_file))
+        out.append(result('generate_map', n, len(matches), t))
+        t = timed(generate_map.main, 1)
+        out.append(result('generate_map_warm', n, len(matches), t))
+
+        # --- build_site: the snapshot is capped so 50k matches don't mean 50k pages ---
+        page_matches = matches[:args.max_match_pages]
+        match_snapshot.write_snapshot(match_snapshot.build_snapshot(page_matches, team_to_league, priorities))
+        asset_cache.clear()
+        t = timed(lambda: build_site.build_site(jobs=args.jobs, force=True), 1)
+        total_pages = len(build_site.BuildManifest(build_site.MANIFEST_PATH).entries)
+        out.append(result('build_site_full', n, total_pages, t, match_pages=len(page_matches), jobs=args.jobs))
+        t = timed(lambda: build_site.build_site(jobs=args.jobs), args.repeat)
+        out.append(result('build_site_noop', n, total_pages, t, jobs=args.jobs))
+
+        # --- render_page per template (same inputs build_site uses) ---
+        out += bench_render(args.render_repeat)
+    finally:
+        os.chdir(cwd)
+        asset_cache.clear()
+        if args.keep: print(f"   (kept {root})")
+        else: shutil.rmtree(root, ignore_errors=True)
+    return out
+
+
+def bench_render(repeat):
+    config = build_site.load_json(build_site.CONFIG_PATH)
+    templates = build_site.load_templates(config)
+    config['_image_map_src'] = publish_image_map(asset_cache.load_data(build_site.IMAGE_MAP_PATH))
+    config['_league_map_src'] = publish_league_map(asset_cache.reverse_league_map(build_site.LEAGUE_MAP_PATH))
+    tasks = build_site.plan_custom_pages(config) + build_site.plan_league_pages(config) + (build_site.plan_match_pages(config) or [])
+    out = []
+    for name in sorted(templates):
+        task = next((t for t in tasks if t['template'] == name), None)
+        if not task: continue
+        render = lambda: build_site.render_page(templates[name], config, copy.deepcopy(task['page']),
+                                                theme_override=task['theme_override'], extra=task['extra'])
+        t = timed(lambda: [render() for _ in range(repeat)], 3)
+        out.append(result(f"render_page[{name}]", None, repeat, t, bytes=len(render().encode('utf-8'))))
+    return out
+
+
+# ==========================================
+# 3. RESULTS
+# ==========================================
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO, capture_output=True, text=True).stdout.strip()
+        return (rev or 'nogit') + ('-dirty' if dirty else '')
+    except OSError:
+        return 'nogit'
+
+
+def previous_result(exclude=None):
+    if not os.path.isdir(BENCH_DIR): return None
+    files = sorted(f for f in os.listdir(BENCH_DIR) if f.endswith('.json') and f != exclude)
+    return os.path.join(BENCH_DIR, files[-1]) if files else None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['bench'], r['size']): r for r in json.load(f).get('results', [])}
+    # Per-item cost, so runs with different --render-repeat / page caps still compare
+    print(f"--- vs {os.path.basename(baseline_path)} (best time per item) ---")
+    for r in results:
+        old = baseline.get((r['bench'], r['size']))
+        if not old: continue
+        change = (r['per_item_us'] - old['per_item_us']) / old['per_item_us'] if old['per_item_us'] else 0
+        flag = "🔴" if change > 0.10 else "🟢" if change < -0.10 else "  "
+        print(f" {flag} {r['bench']:<28} {str(r['size'] or ''):>6}  {old['per_item_us']:.1f} µs -> {r['per_item_us']:.1f} µs ({change:+.0%})")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the build pipeline on synthetic inputs")
+    parser.add_argument('--sizes', default='1000,10000,50000', help="Feed sizes (matches), comma separated")
+    parser.add_argument('--pages', type=int, default=20, help="Extra custom pages in the config")
+    parser.add_argument('--leagues', type=int, default=40, help="Linked leagues added to sport_priorities")
+    parser.add_argument('--logos', type=int, default=3000, help="Logos in the synthetic logo store")
+    parser.add_argument('--max-match-pages', type=int, default=2000, help="Cap on per-match pages built by build_site")
+    parser.add_argument('--fuzzy-queries', type=int, default=500, help="Distinct names timed against the fuzzy index")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per cheap benchmark (best is reported)")
+    parser.add_argument('--render-repeat', type=int, default=50, help="Renders per template in render_page")
+    parser.add_argument('--jobs', type=int, default=1, help="build_site worker processes")
+    parser.add_argument('--compare', help="Result file to compare against (default: the latest in _debug/bench)")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated site trees")
+    args = parser.parse_args()
+
+    teams, leagues = real_names()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    print(f"--- Benchmarks: sizes {sizes}, {args.pages} pages, {args.leagues} leagues, {args.logos} logos "
+          f"({len(teams)} real team names) ---")
+    results = []
+    for n in sizes:
+        print(f"🧪 {n} matches...")
+        for r in bench_size(n, args, teams, leagues):
+            results.append(r)
+            print(f"   {r['bench']:<28} {r['min_s']:.4f}s  ({r['per_item_us']:.1f} µs x {r['items']})")
+
+    revision = git_revision()
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    name = f"{stamp}-{revision}.json"
+    baseline = args.compare or previous_result(exclude=name)
+    with open(os.path.join(BENCH_DIR, name), 'w', encoding='utf-8') as f:
+        json.dump({'revision': revision, 'created_at': stamp, 'python': sys.version.split()[0],
+                   'params': vars(args), 'results': results}, f, indent=2)
+    print(f"💾 Results: {os.path.relpath(os.path.join(BENCH_DIR, name), REPO)}")
+    if baseline: compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+
+# ==========================================
+# INCREMENTAL BUILD MANIFEST
+# ==========================================
+# Records, per generated file, a hash of everything that went into it
+# ("inputs") and a hash of what was written ("output").
+#   - Inputs unchanged AND file on disk still matches "output" -> skip render.
+#   - Rendered bytes identical to the file on disk -> skip the write.
+# Keys are output paths relative to the site root, so build_site.py and
+# core/build_engine.py can share one manifest.
+#
+# Every output written or deleted is also added to a pending list
+# (PENDING_PATH, local only) until a deploy stages it: scripts/git_stage.py
+# commits exactly those files instead of scanning the whole tree.
+MANIFEST_VERSION = 1
+PENDING_PATH = 'assets/data/cache/deploy_pending.json'
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def hash_file(path):
+    if not os.path.exists(path): return None
+    with open(path, 'rb') as f:
+        return hash_bytes(f.read())
+
+
+def fingerprint(*parts):
+    """
+    Stable hash of JSON-serialisable parts (dicts are key-sorted).
+    """
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hash_bytes(blob.encode('utf-8'))
+
+
+def write_if_changed(path, content):
+    """
+    Writes `content` to `path` unless the file already holds the same bytes.
+    Returns (output_hash, written).
+    """
+    data = content.encode('utf-8')
+    digest = hash_bytes(data)
+    if hash_file(path) == digest:
+        return digest, False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return digest, True
+
+
+def pending_outputs(root='.'):
+    """
+    Output keys written or deleted since the last deploy, or None if no build recorded any yet.
+    """
+    try:
+        with open(os.path.join(root, PENDING_PATH), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def add_pending(keys, root='.'):
+    path = os.path.join(root, PENDING_PATH)
+    pending = set(pending_outputs(root) or []) | set(keys)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(sorted(pending), f, indent=0)
+
+
+def clear_pending(root='.'):
+    path = os.path.join(root, PENDING_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([], f)
+
+
+class BuildManifest:
+    def __init__(self, path, root='.', force=False):
+        self.path = path
+        self.root = root
+        self.force = force
+        self.entries = {}
+        self.rebuilt = []    # Rendered and written
+        self.unchanged = []  # Rendered, bytes matched disk
+        self.skipped = []    # Inputs unchanged, not rendered
+        self.removed = []    # Expired outputs deleted via prune()
+        self._dirty = False
+        self._keys = {}  # out_path -> key (relpath is slow, and each page asks 2-3 times)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path): return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('pages', {})
+        except (json.JSONDecodeError, OSError):
+            print(f"⚠️ Warning: {self.path} unreadable. Doing a full rebuild.")
+
+    def key(self, out_path):
+        key = self._keys.get(out_path)
+        if key is None:
+            key = self._keys[out_path] = os.path.relpath(out_path, self.root).replace(os.sep, '/')
+        return key
+
+    def is_fresh(self, out_path, inputs_hash):
+        """
+        True if `out_path` was built from the same inputs and is untouched on disk.
+        """
+        if self.force: return False
+        entry = self.entries.get(self.key(out_path))
+        if not entry or entry.get('inputs') != inputs_hash: return False
+        return hash_file(out_path) == entry.get('output')
+
+    def skip(self, out_path):
+        self.skipped.append(self.key(out_path))
+
+    def record(self, out_path, inputs_hash, output_hash, written):
+        key = self.key(out_path)
+        new_entry = {'inputs': inputs_hash, 'output': output_hash}
+        if self.entries.get(key) != new_entry:
+            self.entries[key] = new_entry
+            self._dirty = True
+        (self.rebuilt if written else self.unchanged).append(key)
+
+    def prune(self, prefix, keep):
+        """
+        Deletes outputs recorded under `prefix` (a relative dir, e.g. "watch/")
+        that are not in `keep` (output paths), plus their now-empty folders.
+        """
+        keep = {self.key(p) for p in keep}
+        for key in sorted(k for k in self.entries if k.startswith(prefix) and k not in keep):
+            path = os.path.join(self.root, key)
+            if os.path.exists(path): os.remove(path)
+            folder = os.path.dirname(path)
+            if folder and os.path.isdir(folder) and not os.listdir(folder): os.rmdir(folder)
+            del self.entries[key]
+            self.removed.append(key)
+            self._dirty = True
+        return self.removed
+
+    def save(self):
+        if self.rebuilt or self.removed: add_pending(self.rebuilt + self.removed, self.root)
+        # Only touch the manifest when an entry changed, so an idle cron tick
+        # leaves the git tree clean (what this run rebuilt is in report()).
+        if not self._dirty: return
+        data = {
+            'version': MANIFEST_VERSION,
+            'pages': dict(sorted(self.entries.items())),
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    def report(self, limit=25):
+        removed = f", {len(self.removed)} removed" if self.removed else ""
+        print(f"📊 Pages: {len(self.rebuilt)} rebuilt, {len(self.unchanged)} unchanged, {len(self.skipped)} skipped{removed}")
+        for key in self.rebuilt[:limit]:
+            print(f"   ✏️ {key}")
+        if len(self.rebuilt) > limit:
+            print(f"   ... and {len(self.rebuilt) - limit} more")
@@ -1,6 +1,17 @@
 import json
 import os
 import re
+import time
+
+import asset_cache
+import html_minify
+import instrument
+import map_assets
+import match_snapshot
+import theme_css
+from build_manifest import BuildManifest, fingerprint, hash_bytes, hash_file, write_if_changed
+from map_assets import MODES as IMAGE_MAP_MODES, league_scope, prune_maps, publish_image_map, publish_league_map
+from template_engine import compile_template
 
 # ==========================================
 # 1. CONFIGURATION
@@ -12,8 +23,25 @@ TEMPLATE_PATH = 'assets/master_template.html'
 WATCH_TEMPLATE_PATH = 'assets/watch_template.html'
 LEAGUE_TEMPLATE_PATH = 'assets/league_template.html'
 PAGE_TEMPLATE_PATH = 'assets/page_template.html'
+MANIFEST_PATH = 'assets/data/build_manifest.json'
 OUTPUT_DIR = '.' 
 
+# Config sections render_page reads for EVERY page (page-specific ones travel with the task)
+SHARED_CONFIG_KEYS = ['site_settings', 'theme', 'menus', 'sport_priorities', 'social_sharing']
+
+# Non-placeholder spots render_page rewrites (tokenized as named slots at compile time)
+TEMPLATE_MARKERS = {
+    'HTML_LANG': 'lang="en"',
+    'HEAD_CLOSE': '</head>',
+    'CANONICAL_LINK': '<link rel="canonical" href="{{CANONICAL_URL}}">',
+    'SHARE_CONFIG': re.compile(r'const SHARE_CONFIG = \{.*?\};', re.DOTALL),
+    # watch_template.html leaves these empty; per-match pages fill them
+    'WATCH_TITLE': '<title></title>',
+    'WATCH_DESC': '<meta name="description" content="">',
+    # The big theme <style> block: published as a shared hashed stylesheet (scripts/theme_css.py)
+    theme_css.SLOT: theme_css.STYLE_BLOCK,
+}
+
 # ==========================================
 # SMART ENTITY MAPPING (LEAGUE -> SPORT)
 # ==========================================
@@ -177,7 +205,37 @@ def build_footer_grid(config):
     html += '</div>'
     
     return html
-def render_page(template, config, page_data, theme_override=None):
+def map_payload(config, page_data):
+    """
+    JS_LEAGUE_MAP / JS_IMAGE_MAP (+ their *_SRC fallbacks) for one page.
+    """
+    image_map_src = config.get('_image_map_src')
+    compact = bool(config.get('_minify'))
+    dumps = lambda value: html_minify.dumps(value, compact)
+    if not image_map_src:
+        # Inline: the REVERSED map (Team -> League) + the full image map.
+        # Both blobs are parsed + serialised once per build (see asset_cache).
+        return {'JS_LEAGUE_MAP': asset_cache.reverse_league_map_json(LEAGUE_MAP_PATH, compact), 'JS_LEAGUE_MAP_SRC': 'null',
+                'JS_IMAGE_MAP': asset_cache.data_json(IMAGE_MAP_PATH, compact), 'JS_IMAGE_MAP_SRC': 'null'}
+
+    page_filter = page_data.get('map_scope')
+    leagues = league_scope(asset_cache.load_data(LEAGUE_MAP_PATH), page_filter) if page_filter else []
+    if not leagues:
+        # External map: the page only carries the pointer, JS fetches the (cached) file
+        return {'JS_LEAGUE_MAP': asset_cache.reverse_league_map_json(LEAGUE_MAP_PATH, compact), 'JS_LEAGUE_MAP_SRC': 'null',
+                'JS_IMAGE_MAP': dumps({"teams": {}, "leagues": {}}), 'JS_IMAGE_MAP_SRC': dumps(image_map_src)}
+
+    # League page: only this league's teams inline, the shared files cover any other name.
+    # The league logo is resolved here, so the page never needs the leagues file.
+    image_map, team_map = prune_maps(asset_cache.load_data(IMAGE_MAP_PATH), asset_cache.reverse_league_map(LEAGUE_MAP_PATH),
+                                     asset_cache.team_slug_index(IMAGE_MAP_PATH), leagues, page_filter)
+    return {'JS_LEAGUE_MAP': dumps(team_map), 'JS_LEAGUE_MAP_SRC': dumps(config.get('_league_map_src')),
+            'JS_IMAGE_MAP': dumps(image_map), 'JS_IMAGE_MAP_SRC': dumps({'teams': image_map_src['teams']})}
+
+def load_template(text):
+    return compile_template(text, TEMPLATE_MARKERS)
+
+def render_page(template, config, page_data, theme_override=None, extra=None):
     s = config.get('site_settings', {})
     # MERGE LOGIC: Use Base Theme as default, then overwrite with League Theme
     base_theme = config.get('theme', {}).copy()
@@ -187,7 +245,8 @@ def render_page(template, config, page_data, theme_override=None):
     
     m = config.get('menus', {})
     
-    html = template
+    template = load_template(template)
+    ctx = {}
     
     # --- THEME DEFAULTS ---
     defaults = {
@@ -352,16 +411,16 @@ def render_page(template, config, page_data, theme_override=None):
     for key, val in theme.items():
         if isinstance(val, bool):
             val = str(val).lower()
-        html = html.replace(f"{{{{THEME_{key.upper()}}}}}", str(val))
-        grid_cols = str(theme.get('footer_columns', '2'))
-    html = html.replace('{{THEME_FOOTER_COLS}}', f'repeat({grid_cols}, 1fr)')
+        ctx[f"THEME_{key.upper()}"] = str(val)
+    grid_cols = str(theme.get('footer_columns', '2'))
+    ctx['THEME_FOOTER_COLS'] = f'repeat({grid_cols}, 1fr)'
 
     # --- LAYOUT/HERO LOGIC ---
     h_layout = theme.get('header_layout', 'standard')
     h_icon = theme.get('header_icon_pos', 'left')
     header_class = f"h-layout-{h_layout}"
     if h_layout == 'center': header_class += f" h-icon-{h_icon}"
-    html = html.replace('{{HEADER_CLASSES}}', header_class)
+    ctx['HEADER_CLASSES'] = header_class
 
     hero_style = theme.get('hero_bg_style', 'solid')
     hero_css = ""
@@ -379,10 +438,10 @@ def render_page(template, config, page_data, theme_override=None):
     intro_margin = '0 auto' if align == 'center' else ('0' if align == 'left' else '0 0 0 auto')
     menu_justify = align_items
 
-    html = html.replace('{{THEME_HERO_TEXT_ALIGN}}', align)
-    html = html.replace('{{THEME_HERO_ALIGN_ITEMS}}', align_items)
-    html = html.replace('{{THEME_HERO_INTRO_MARGIN}}', intro_margin)
-    html = html.replace('{{THEME_HERO_MENU_JUSTIFY}}', menu_justify)
+    ctx['THEME_HERO_TEXT_ALIGN'] = align
+    ctx['THEME_HERO_ALIGN_ITEMS'] = align_items
+    ctx['THEME_HERO_INTRO_MARGIN'] = intro_margin
+    ctx['THEME_HERO_MENU_JUSTIFY'] = menu_justify
 
     h_mode = theme.get('hero_layout_mode', 'full')
     box_b_str = f"{ensure_unit(theme.get('hero_box_border_width'), 'px')} solid {theme.get('hero_box_border_color')}"
@@ -407,33 +466,35 @@ def render_page(template, config, page_data, theme_override=None):
         if main_pos == 'full': hero_outer_style += f" {main_border_str}"
         hero_inner_style = "max-width: var(--container-max-width); margin: 0 auto;"
 
-    html = html.replace('{{HERO_OUTER_STYLE}}', hero_outer_style)
-    html = html.replace('{{HERO_INNER_STYLE}}', hero_inner_style)
-    html = html.replace('{{HERO_MENU_DISPLAY}}', theme.get('hero_menu_visible', 'flex'))
-    html = html.replace('{{JS_THEME_CONFIG}}', json.dumps(theme))
-    html = html.replace('{{WILDCARD_CATEGORY}}', theme.get('wildcard_category', ''))
+    ctx['HERO_OUTER_STYLE'] = hero_outer_style
+    ctx['HERO_INNER_STYLE'] = hero_inner_style
+    ctx['HERO_MENU_DISPLAY'] = theme.get('hero_menu_visible', 'flex')
+    ctx['JS_THEME_CONFIG'] = html_minify.dumps(theme, config.get('_minify'))
+    ctx['WILDCARD_CATEGORY'] = theme.get('wildcard_category', '')
     
     # Text Replacements
-    html = html.replace('{{TEXT_LIVE_SECTION_TITLE}}', theme.get('text_live_section_title', 'Trending Live'))
-    html = html.replace('{{TEXT_SHOW_MORE}}', theme.get('text_show_more', 'Show More'))
-    html = html.replace('{{TEXT_WATCH_BTN}}', theme.get('text_watch_btn', 'WATCH'))
-    html = html.replace('{{TEXT_HD_BADGE}}', theme.get('text_hd_badge', 'HD'))
-    html = html.replace('{{TEXT_SECTION_LINK}}', theme.get('text_section_link', 'View All'))
-    html = html.replace('{{TEXT_SECTION_PREFIX}}', theme.get('text_section_prefix', 'Upcoming'))
-    html = html.replace('{{TEXT_WILDCARD_TITLE}}', theme.get('text_wildcard_title', ''))
-    html = html.replace('{{THEME_TEXT_SYS_STATUS}}', theme.get('text_sys_status', 'System Status: Online'))
-    html = html.replace('{{TEXT_TOP_UPCOMING_TITLE}}', theme.get('text_top_upcoming_title', ''))
-
-    html = html.replace('{{BRAND_PRIMARY}}', theme.get('brand_primary'))
-    html = html.replace('{{API_URL}}', s.get('api_url', ''))
+    ctx['TEXT_LIVE_SECTION_TITLE'] = theme.get('text_live_section_title', 'Trending Live')
+    ctx['TEXT_SHOW_MORE'] = theme.get('text_show_more', 'Show More')
+    ctx['TEXT_WATCH_BTN'] = theme.get('text_watch_btn', 'WATCH')
+    ctx['TEXT_HD_BADGE'] = theme.get('text_hd_badge', 'HD')
+    ctx['TEXT_SECTION_LINK'] = theme.get('text_section_link', 'View All')
+    ctx['TEXT_SECTION_PREFIX'] = theme.get('text_section_prefix', 'Upcoming')
+    ctx['TEXT_WILDCARD_TITLE'] = theme.get('text_wildcard_title', '')
+    ctx['THEME_TEXT_SYS_STATUS'] = theme.get('text_sys_status', 'System Status: Online')
+    ctx['TEXT_TOP_UPCOMING_TITLE'] = theme.get('text_top_upcoming_title', '')
+
+    ctx['BRAND_PRIMARY'] = theme.get('brand_primary')
+    ctx['API_URL'] = s.get('api_url', '')
+    ctx['MATCH_SNAPSHOT_URL'] = match_snapshot.SNAPSHOT_URL
+    ctx['JS_LIVE_REFRESH'] = match_snapshot.live_refresh_seconds(s)
     country = s.get('target_country', 'US')
-    html = html.replace('{{TARGET_COUNTRY}}', country)
-    html = html.replace('lang="en"', f'lang="en-GB"' if country == 'UK' else 'lang="en-US"')
+    ctx['TARGET_COUNTRY'] = country
+    ctx['HTML_LANG'] = 'lang="en-GB"' if country == 'UK' else 'lang="en-US"'
     
     p1 = s.get('title_part_1', 'Stream')
     p2 = s.get('title_part_2', 'East')
     site_name = f"{p1}{p2}"
-    html = html.replace('{{SITE_NAME}}', site_name)
+    ctx['SITE_NAME'] = site_name
     domain = s.get('domain', 'example.com')
     
     # Logo Logic
@@ -443,31 +504,31 @@ def render_page(template, config, page_data, theme_override=None):
     if og_image.lower().endswith('.webp'): og_mime = "image/webp"
     elif og_image.lower().endswith(('.jpg', '.jpeg')): og_mime = "image/jpeg"
     
-    html = html.replace('{{OG_IMAGE}}', og_image)
-    html = html.replace('{{OG_MIME}}', og_mime)
+    ctx['OG_IMAGE'] = og_image
+    ctx['OG_MIME'] = og_mime
     logo_html = f'<div class="logo-text">{p1}<span>{p2}</span></div>'
     if s.get('logo_url'): logo_html = f'<img src="{s.get("logo_url")}" class="logo-img" alt="{site_name} Logo" fetchpriority="high"> {logo_html}'
     config['_generated_logo_html'] = logo_html      # <--- FIX: Remove spaces to align with 'if'
-    html = html.replace('{{LOGO_HTML}}', logo_html)
-    html = html.replace('{{DOMAIN}}', domain)
+    ctx['LOGO_HTML'] = logo_html
+    ctx['DOMAIN'] = domain
     p_live = s.get('param_live', 'stream')
     p_info = s.get('param_info', 'info')
     
-    html = html.replace('{{PARAM_LIVE}}', p_live)
-    html = html.replace('{{PARAM_INFO}}', p_info)
-    html = html.replace('{{FAVICON}}', s.get('favicon_url', ''))
+    ctx['PARAM_LIVE'] = p_live
+    ctx['PARAM_INFO'] = p_info
+    ctx['FAVICON'] = s.get('favicon_url', '')
 
-    html = html.replace('{{HEADER_MENU}}', build_menu_html(m.get('header', []), 'header'))
-    html = html.replace('{{HERO_PILLS}}', build_menu_html(m.get('hero', []), 'hero'))
+    ctx['HEADER_MENU'] = build_menu_html(m.get('header', []), 'header')
+    ctx['HERO_PILLS'] = build_menu_html(m.get('hero', []), 'hero')
     
     auto_footer_leagues = []
     priorities = config.get('sport_priorities', {}).get(country, {})
     if priorities:
         for name, data in sorted([item for item in priorities.items() if not item[0].startswith('_')], key=lambda x: x[1].get('score', 0), reverse=True):
             if data.get('hasLink'): auto_footer_leagues.append({'title': name, 'url': f'/{normalize_key(name)}-streams/'})
-    html = html.replace('{{FOOTER_LEAGUES}}', build_menu_html(auto_footer_leagues, 'footer_leagues'))
+    ctx['FOOTER_LEAGUES'] = build_menu_html(auto_footer_leagues, 'footer_leagues')
 
-    html = html.replace('{{FOOTER_COPYRIGHT}}', s.get('footer_copyright', f"&copy; 2025 {domain}"))
+    ctx['FOOTER_COPYRIGHT'] = s.get('footer_copyright', f"&copy; 2025 {domain}")
     
     # <--- FIX: Add indentation to this whole block
     temp_config = config.copy()
@@ -477,57 +538,51 @@ def render_page(template, config, page_data, theme_override=None):
 
     # 2. Build the Grid
     footer_grid_html = build_footer_grid(temp_config)
-    html = html.replace('{{FOOTER_GRID_CONTENT}}', footer_grid_html)
+    ctx['FOOTER_GRID_CONTENT'] = footer_grid_html
     # <--- End of fix
 
     layout = page_data.get('layout', 'page')
     if layout == 'watch':
-        html = html.replace('{{META_TITLE}}', '').replace('{{META_DESC}}', '').replace('<link rel="canonical" href="{{CANONICAL_URL}}">', '')
-        html = html.replace('{{H1_TITLE}}', '').replace('{{HERO_TEXT}}', '').replace('{{DISPLAY_HERO}}', 'none')
-        html = html.replace('</head>', '<style>.hero, #live-section, #upcoming-container { display: none !important; }</style></head>')
+        ctx['META_TITLE'] = ctx['META_DESC'] = ctx['CANONICAL_LINK'] = ''
+        ctx['H1_TITLE'] = ctx['HERO_TEXT'] = ''
+        ctx['DISPLAY_HERO'] = 'none'
+        ctx['HEAD_CLOSE'] = '<style>.hero, #live-section, #upcoming-container { display: none !important; }</style></head>'
+        ctx['JS_STATIC_MATCH_ID'] = json.dumps(page_data.get('match_id'))
+        if page_data.get('match_id'):
+            # Per-match page: SEO text is in the HTML before any JS runs
+            ctx['WATCH_TITLE'] = f"<title>{page_data['meta_title']}</title>"
+            ctx['WATCH_DESC'] = f'<meta name="description" content="{page_data["meta_desc"]}">'
+            ctx['CANONICAL_LINK'] = f'<link rel="canonical" href="{page_data["canonical_url"]}">'
     else:
-        html = html.replace('{{META_TITLE}}', page_data.get('meta_title') or f"{site_name} - {page_data.get('title')}")
-        html = html.replace('{{META_DESC}}', page_data.get('meta_desc', ''))
-        html = html.replace('{{H1_TITLE}}', page_data.get('title', ''))
+        ctx['META_TITLE'] = page_data.get('meta_title') or f"{site_name} - {page_data.get('title')}"
+        ctx['META_DESC'] = page_data.get('meta_desc', '')
+        ctx['H1_TITLE'] = page_data.get('title', '')
         default_align = theme.get('static_h1_align', 'left') 
-        html = html.replace('{{H1_ALIGN}}', page_data.get('h1_align') or default_align)
-        html = html.replace('{{HERO_TEXT}}', page_data.get('hero_text') or page_data.get('meta_desc', ''))
+        ctx['H1_ALIGN'] = page_data.get('h1_align') or default_align
+        ctx['HERO_TEXT'] = page_data.get('hero_text') or page_data.get('meta_desc', '')
         canon = page_data.get('canonical_url', '') or (f"https://{domain}/{page_data.get('slug')}/" if page_data.get('slug') != 'home' else f"https://{domain}/")
-        html = html.replace('{{CANONICAL_URL}}', canon)
+        ctx['CANONICAL_URL'] = canon
 
-    html = html.replace('{{META_KEYWORDS}}', f'<meta name="keywords" content="{page_data.get("meta_keywords")}">' if page_data.get('meta_keywords') else '')
+    ctx['META_KEYWORDS'] = f'<meta name="keywords" content="{page_data.get("meta_keywords")}">' if page_data.get('meta_keywords') else ''
     
     # FIX: Allow 'league' layout to show Hero and Match Sections
     if layout in ['home', 'league']: 
-        html = html.replace('{{DISPLAY_HERO}}', theme.get('display_hero', 'block'))
+        ctx['DISPLAY_HERO'] = theme.get('display_hero', 'block')
     elif layout != 'watch': 
         # Only hide sections for static pages (About, Contact, etc.)
-        html = html.replace('{{DISPLAY_HERO}}', 'none')
-        html = html.replace('</head>', '<style>#live-section, #upcoming-container { display: none !important; }</style></head>')
+        ctx['DISPLAY_HERO'] = 'none'
+        ctx['HEAD_CLOSE'] = '<style>#live-section, #upcoming-container { display: none !important; }</style></head>'
 
-    html = html.replace('{{ARTICLE_CONTENT}}', page_data.get('content', ''))
+    ctx['ARTICLE_CONTENT'] = page_data.get('content', '')
 
     # --- INJECTIONS (OPTIMIZED) ---
-    html = html.replace('{{JS_PRIORITIES}}', json.dumps(priorities))
+    ctx['JS_PRIORITIES'] = html_minify.dumps(priorities, config.get('_minify'))
     
     social_data = config.get('social_sharing', {})
     js_social = {"excluded": [x.strip() for x in social_data.get('excluded_pages', '').split(',') if x.strip()], "counts": social_data.get('counts', {})}
-    html = re.sub(r'const SHARE_CONFIG = \{.*?\};', f'const SHARE_CONFIG = {json.dumps(js_social)};', html, flags=re.DOTALL)
+    ctx['SHARE_CONFIG'] = f'const SHARE_CONFIG = {html_minify.dumps(js_social, config.get("_minify"))};'
 
-    # 1. LOAD LEAGUE MAP
-    league_map_data = load_json(LEAGUE_MAP_PATH)
-    
-    # 2. CREATE REVERSE MAP (Team -> League) SERVER SIDE
-    reverse_map = {}
-    if league_map_data:
-        for league_name, teams in league_map_data.items():
-            for team in teams:
-                # Store as key: team-slug, value: League Name
-                reverse_map[team] = league_name
-    
-    # Inject the REVERSED map instead of the raw map
-    html = html.replace('{{JS_LEAGUE_MAP}}', json.dumps(reverse_map))
-    html = html.replace('{{JS_IMAGE_MAP}}', json.dumps(load_json(IMAGE_MAP_PATH)))
+    ctx.update(map_payload(config, page_data))
 
     # --- STATIC SCHEMAS ---
     schemas = []
@@ -584,22 +639,58 @@ def render_page(template, config, page_data, theme_override=None):
             "mainEntity": {"@id": f"{page_data.get('canonical_url')}#events"} 
         })
 
-    html = html.replace('{{SCHEMA_BLOCK}}', f'<script type="application/ld+json">{json.dumps({"@context": "https://schema.org", "@graph": schemas}, indent=2)}</script>' if schemas else '')
-    html = html.replace('{{LOGO_PRELOAD}}', f'<link rel="preload" as="image" href="{s.get("logo_url")}" fetchpriority="high">' if s.get('logo_url') else '')
-    html = html.replace('{{HEADER_CLASSES}}', '').replace('{{MAIN_CONTAINER_CLASSES}}', '').replace('{{FOOTER_CLASSES}}', '')
+    ctx['SCHEMA_BLOCK'] = f'<script type="application/ld+json">{json.dumps({"@context": "https://schema.org", "@graph": schemas}, indent=2)}</script>' if schemas else ''
+    ctx['LOGO_PRELOAD'] = f'<link rel="preload" as="image" href="{s.get("logo_url")}" fetchpriority="high">' if s.get('logo_url') else ''
+    ctx['MAIN_CONTAINER_CLASSES'] = ctx['FOOTER_CLASSES'] = ''
 
-    return html
+    # Late injections only fill slots the page itself left empty
+    for key, val in (extra or {}).items():
+        ctx.setdefault(key, val)
+
+    # Theme CSS: render the block with this page's values, then link the shared hashed file
+    css_block = template.slot(theme_css.SLOT)
+    if css_block is not None:
+        ctx[theme_css.SLOT] = theme_css.stylesheet_tags(css_block.render(ctx), config.get('_theme_css', 'external'))
+
+    return template.render(ctx)
 
 # ==========================================
 # 4. MAIN BUILD PROCESS
 # ==========================================
-def build_site():
-    print("--- 🔨 Starting Build Process ---")
-    config = load_json(CONFIG_PATH)
-    if not config: 
-        print("❌ Config not found!")
-        return
+def page_path(slug):
+    out_dir = os.path.join(OUTPUT_DIR, slug) if slug != 'home' else OUTPUT_DIR
+    return os.path.join(out_dir, 'index.html')
+
+# Every module whose code shapes the written pages: editing one re-renders them all
+RENDERER_MODULES = ('build_site.py', 'template_engine.py', 'theme_css.py', 'html_minify.py', 'map_assets.py',
+                    'match_snapshot.py', 'asset_cache.py')
 
+def build_fingerprint(config):
+    """
+    Hash of the inputs every page shares: renderer code, shared config
+    sections and the data maps.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    return fingerprint(
+        [hash_file(os.path.join(here, name)) for name in RENDERER_MODULES],
+        {k: config.get(k) for k in SHARED_CONFIG_KEYS},
+        config.get('_image_map_src'),
+        config.get('_league_map_src'),
+        config.get('_theme_css'),
+        config.get('_minify'),
+        hash_file(IMAGE_MAP_PATH),
+        hash_file(LEAGUE_MAP_PATH),
+    )
+
+def task_fingerprint(task, template_hashes, shared_hash):
+    return fingerprint(shared_hash, template_hashes[task['template']],
+                       task['page'], task['theme_override'], task['extra'])
+
+def load_templates(config):
+    """
+    Reads and compiles every template once. Returns a dict keyed by
+    template name, or None if a required template is missing.
+    """
     try:
         with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f: master_template_content = f.read()
         with open(WATCH_TEMPLATE_PATH, 'r', encoding='utf-8') as f: watch_template_content = f.read()
@@ -611,10 +702,42 @@ def build_site():
             
     except FileNotFoundError:
         print("❌ Template file not found")
-        return
+        return None
+
+    # Compile once per build: every page below renders with a single join
+    templates = {
+        'master': load_template(master_template_content),
+        'page': load_template(page_template_content),
+    }
+
+    # INJECT WATCH CONFIG (build-wide, so bake it into the template before compiling)
+    w_conf = config.get('watch_settings', {})
+    templates['watch'] = load_template(load_template(watch_template_content).render({
+        'SUPABASE_URL': w_conf.get('supabase_url', ''),
+        'SUPABASE_KEY': w_conf.get('supabase_key', ''),
+        'WATCH_ARTICLE': w_conf.get('article', ''),
+        'WATCH_AD_MOBILE': w_conf.get('ad_mobile', ''),
+        'WATCH_AD_SIDEBAR_1': w_conf.get('ad_sidebar_1', ''),
+        'WATCH_AD_SIDEBAR_2': w_conf.get('ad_sidebar_2', ''),
+        # NEW: Inject SEO Templates into JS Variables
+        # We use distinct placeholders so we don't conflict with standard META tags
+        'JS_WATCH_TITLE_TPL': w_conf.get('meta_title', 'Watch {{HOME}} vs {{AWAY}} Live'),
+        'JS_WATCH_DESC_TPL': w_conf.get('meta_desc', 'Watch {{HOME}} vs {{AWAY}} live stream online.'),
+    }))
+
+    if os.path.exists(LEAGUE_TEMPLATE_PATH):
+        with open(LEAGUE_TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+            templates['league'] = load_template(f.read())
+
+    return templates
+
+def plan_custom_pages(config):
+    """
+    One render task per entry in config['pages'].
+    A task is a plain dict so it can be shipped to a worker process.
+    """
+    tasks = []
 
-    print("📄 Building Pages...")
-    
     # Get Theme Contexts
     theme_page_conf = config.get('theme_page', {}) # Get Static Context
     if not theme_page_conf: theme_page_conf = config.get('theme', {})
@@ -629,141 +752,314 @@ def build_site():
         
         layout = page.get('layout')
         
-        final_template = master_template_content
+        template_name = 'master'
         active_theme_override = None
 
-        # ... inside the loop ...
         if layout == 'watch':
-            final_template = watch_template_content
+            template_name = 'watch'
             active_theme_override = theme_watch_conf 
-            
-            # INJECT WATCH CONFIG
-            w_conf = config.get('watch_settings', {})
-            final_template = final_template.replace('{{SUPABASE_URL}}', w_conf.get('supabase_url', ''))
-            final_template = final_template.replace('{{SUPABASE_KEY}}', w_conf.get('supabase_key', ''))
-            final_template = final_template.replace('{{WATCH_ARTICLE}}', w_conf.get('article', ''))
-            final_template = final_template.replace('{{WATCH_AD_MOBILE}}', w_conf.get('ad_mobile', ''))
-            final_template = final_template.replace('{{WATCH_AD_SIDEBAR_1}}', w_conf.get('ad_sidebar_1', ''))
-            final_template = final_template.replace('{{WATCH_AD_SIDEBAR_2}}', w_conf.get('ad_sidebar_2', ''))
-            
-            # NEW: Inject SEO Templates into JS Variables
-            # We use distinct placeholders so we don't conflict with standard META tags
-            final_template = final_template.replace('{{JS_WATCH_TITLE_TPL}}', w_conf.get('meta_title', 'Watch {{HOME}} vs {{AWAY}} Live'))
-            final_template = final_template.replace('{{JS_WATCH_DESC_TPL}}', w_conf.get('meta_desc', 'Watch {{HOME}} vs {{AWAY}} live stream online.'))
 
             # Fallback for the static page load (before JS runs)
             page['meta_title'] = "Watch Live Sports"
             page['meta_desc'] = "Live sports streaming coverage."
-        # ... rest of loop
         elif layout == 'page':
-            final_template = page_template_content
+            template_name = 'page'
             active_theme_override = theme_page_conf # Apply Static Context
+
+        tasks.append({'slug': slug, 'template': template_name, 'page': page,
+                      'theme_override': active_theme_override, 'extra': None, 'log': None})
+    return tasks
+
+def plan_league_pages(config):
+    """
+    One render task per linked entry in sport_priorities for the target country.
+    """
+    tasks = []
+    target_country = config.get('site_settings', {}).get('target_country', 'US')
+    priorities = config.get('sport_priorities', {}).get(target_country, {})
+    articles = config.get('articles', {})
+    
+    # Get League Theme or fallback
+    theme_league = config.get('theme_league', {})
+    if not theme_league: theme_league = config.get('theme', {})
+
+    for name, data in priorities.items():
+        if name.startswith('_') or not data.get('hasLink'): continue
         
-        # Render
-        final_html = render_page(final_template, config, page, theme_override=active_theme_override)
+        slug = normalize_key(name) + "-streams"
+        is_league = data.get('isLeague', False)
         
-        out_dir = os.path.join(OUTPUT_DIR, slug) if slug != 'home' else OUTPUT_DIR
-        os.makedirs(out_dir, exist_ok=True)
-        with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
-            f.write(final_html)
-    
+        # Entity Intelligence (Parent Sport)
+        parent_sport = LEAGUE_PARENT_MAP.get(name)
+        if not parent_sport:
+            lower_name = name.lower()
+            if "football" in lower_name or "soccer" in lower_name: parent_sport = "Soccer"
+            elif "basket" in lower_name: parent_sport = "Basketball"
+            elif "fight" in lower_name: parent_sport = "Combat Sports"
+            elif "racing" in lower_name or "motor" in lower_name: parent_sport = "Motorsport"
+            else: parent_sport = name
+
+        # 1. Prepare Variables
+        vars_map = {'{{NAME}}': name, '{{SPORT}}': parent_sport, '{{YEAR}}': "2025", '{{DOMAIN}}': config['site_settings']['domain']}
+        
+        def replace_vars(text, v_map):
+            if not text: return ""
+            for k, v in v_map.items():
+                text = text.replace(k, v)
+            return text
+
+        # 2. Define Content & TITLES (Fixes Title Issue)
+        p_h1 = replace_vars(articles.get('league_h1', 'Watch {{NAME}} Live'), vars_map)
+        p_intro = replace_vars(articles.get('league_intro', ''), vars_map)
+        
+        # Process Section Titles (NEW FIX)
+        sec_live = replace_vars(articles.get('league_live_title', 'Live {{NAME}}'), vars_map)
+        sec_upc = replace_vars(articles.get('league_upcoming_title', 'Upcoming {{NAME}}'), vars_map)
+        
+        raw_art = articles.get('league', '') if is_league else articles.get('sport', '')
+        final_art = replace_vars(raw_art, vars_map)
+
+        # 3. PAGE DATA Construction
+        page_data = {
+            'title': p_h1, 
+            'meta_title': p_h1,
+            'meta_desc': p_intro, 
+            'hero_h1': p_h1, 
+            'hero_text': p_intro,
+            'canonical_url': f"https://{config['site_settings']['domain']}/{slug}/",
+            'slug': slug, 
+            'layout': 'league', 
+            'content': final_art,
+            'meta_keywords': f"{name} stream, watch {name} free, {name} live",
+            'schemas': {'org': True, 'website': True},
+            'map_scope': name  # Prune the inline maps to this league's teams
+        }
+
+        # 4. Injections (Fixes Placeholder Issue)
+        league_vars = {
+            'PAGE_FILTER': name,
+            'LEAGUE_ARTICLE': final_art,
+            'TEXT_LIVE_SECTION_TITLE': sec_live, # Inject Processed Title
+            'TEXT_UPCOMING_TITLE': sec_upc,      # Inject Processed Title
+            'HERO_PILLS': build_menu_html(config.get('menus', {}).get('hero', []), 'hero'),
+        }
+
+        tasks.append({'slug': slug, 'template': 'league', 'page': page_data,
+                      'theme_override': theme_league, 'extra': league_vars,
+                      'log': f"   -> Built: {slug} (Filter: {name})"})
+    return tasks
+
+def plan_match_pages(config):
+    """
+    One static watch page per match in the build-time snapshot
+    (assets/data/matches.json, written by core/build_engine.py).
+    Returns None when there is no snapshot, so expired pages are kept.
+    """
+    snapshot = match_snapshot.load_snapshot(match_snapshot.SNAPSHOT_PATH)
+    if not snapshot or not snapshot.get('matches'): return None
+
+    s = config.get('site_settings', {})
+    site_name = f"{s.get('title_part_1', 'Stream')}{s.get('title_part_2', 'East')}"
+    team_to_league = asset_cache.reverse_league_map(LEAGUE_MAP_PATH)
+    theme_watch = config.get('theme_watch', {}) or config.get('theme', {})
+
+    tasks = {}
+    for m in snapshot['matches']:
+        if not match_snapshot.match_page_slug(m.get('id')): continue
+        page = match_snapshot.watch_page_data(m, team_to_league, config.get('watch_settings', {}), site_name,
+                                              s.get('domain', 'example.com'), s.get('target_country', 'US'))
+        tasks[page['slug']] = {'slug': page['slug'], 'template': 'watch', 'page': page,
+                               'theme_override': theme_watch, 'extra': None, 'log': None}
+    return list(tasks.values())
+
+# --- PARALLEL RENDERING ---
+# Workers receive config + compiled templates ONCE (pool initializer),
+# then only small task dicts travel over the pipe.
+_worker_state = {}
+
+def _init_worker(config, templates):
+    instrument.in_worker()
+    _worker_state['config'] = config
+    _worker_state['templates'] = templates
+
+def run_task(task, config=None, templates=None):
+    config = config if config is not None else _worker_state['config']
+    templates = templates if templates is not None else _worker_state['templates']
+    html = render_page(templates[task['template']], config, task['page'],
+                       theme_override=task['theme_override'], extra=task['extra'])
+    rendered = len(html.encode('utf-8'))
+    if config.get('_minify'):
+        html, ok = html_minify.minify_page(html)
+        if not ok: print(f"⚠️ Minify changed a script on {task['slug']}. Written unminified.")
+    return write_if_changed(page_path(task['slug']), html) + ((rendered, len(html.encode('utf-8'))),)
+
+def run_tasks(tasks, config, templates, jobs=1):
+    """
+    Renders + writes every task, yielding (task, (output_hash, written, (rendered_bytes, written_bytes)))
+    in submission order once done.
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield task, run_task(task, config, templates)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config, templates)) as pool:
+        # map() yields in submission order, so logs stay deterministic
+        yield from zip(tasks, pool.map(run_task, tasks))
+
+def image_map_report(tasks, templates, config):
+    """
+    Per-page bytes saved by the external / pruned maps compared to inlining both in full.
+    """
+    if not config.get('_image_map_src'): return
+    inline = {'JS_IMAGE_MAP': asset_cache.data_json(IMAGE_MAP_PATH), 'JS_LEAGUE_MAP': asset_cache.reverse_league_map_json(LEAGUE_MAP_PATH)}
+    total = pages = 0
+    print(f"📦 Maps: external ({len(inline['JS_IMAGE_MAP'].encode('utf-8')) / 1024:.0f} KB image map no longer inlined)")
+    for task in tasks:
+        keys = templates[task['template']].keys
+        if 'JS_IMAGE_MAP' not in keys or task['page'].get('match_id'): continue
+        payload = map_payload(config, task['page'])
+        saved = sum(len(inline[k].encode('utf-8')) - len(payload[k].encode('utf-8')) - len(payload[k + '_SRC'].encode('utf-8'))
+                    for k in inline if k in keys)
+        note = " (pruned)" if payload['JS_LEAGUE_MAP_SRC'] != 'null' else ""
+        print(f"   -> {task['slug']}: -{saved / 1024:.1f} KB{note}")
+        total += saved
+        pages += 1
+    if pages: print(f"   Total: -{total / 1024:.0f} KB across {pages} pages")
+
+def minify_report(sizes, limit=25):
+    """
+    Bytes the minify pass removed from each page rendered this run (biggest savings first).
+    """
+    if not sizes: return
+    before = sum(b for _, b, _ in sizes)
+    after = sum(a for _, _, a in sizes)
+    print(f"🧹 Minify: {before / 1024:.0f} KB -> {after / 1024:.0f} KB (-{(before - after) / max(before, 1):.0%}) across {len(sizes)} rendered pages")
+    for slug, b, a in sorted(sizes, key=lambda x: x[2] - x[1])[:limit]:
+        print(f"   -> {slug}: {b / 1024:.1f} KB -> {a / 1024:.1f} KB (-{(b - a) / 1024:.1f} KB)")
+    if len(sizes) > limit: print(f"   ... and {len(sizes) - limit} more")
+
+def build_site(jobs=1, force=False, image_map_mode='external', matches_only=False, theme_css_mode='external', minify=False,
+               config=None):
+    """
+    Builds every page whose inputs changed. `config`: an already parsed
+    config to build from instead of CONFIG_PATH (the CMS server passes the
+    one it just saved; it is modified in place). Returns a summary:
+    {'rebuilt': [...], 'unchanged': n, 'skipped': n, 'removed': [...], 'render_ms': ms}.
+    """
+    print("--- 🔨 Starting Build Process ---")
+    instrument.mark('load')
+    config = config if config is not None else load_json(CONFIG_PATH)
+    if not config: 
+        print("❌ Config not found!")
+        return None
+
+    templates = load_templates(config)
+    if templates is None: return None
+
+    # Warm the map cache before any worker forks, so it is parsed exactly once
+    asset_cache.reverse_league_map_json(LEAGUE_MAP_PATH, minify)
+    asset_cache.data_json(IMAGE_MAP_PATH, minify)
+
+    # Publish the versioned image map (pages then reference it instead of inlining)
+    config['_image_map_src'] = publish_image_map(asset_cache.load_data(IMAGE_MAP_PATH), mode=image_map_mode)
+    # ...and the full team -> league map, the fallback for pruned league pages
+    config['_league_map_src'] = publish_league_map(asset_cache.reverse_league_map(LEAGUE_MAP_PATH)) if config['_image_map_src'] else None
+    config['_theme_css'] = theme_css_mode
+    config['_minify'] = minify
+
+    instrument.mark('plan')
+    print("📄 Building Pages...")
+    page_tasks = [] if matches_only else plan_custom_pages(config)
+
     # ==========================================
     # 5. BUILD LEAGUE PAGES
     # ==========================================
-    print("🏆 Building League Pages...")
-    
-    league_template_content = None
-    if os.path.exists(LEAGUE_TEMPLATE_PATH):
-        with open(LEAGUE_TEMPLATE_PATH, 'r', encoding='utf-8') as f:
-            league_template_content = f.read()
-    
-    if league_template_content:
-        target_country = config.get('site_settings', {}).get('target_country', 'US')
-        priorities = config.get('sport_priorities', {}).get(target_country, {})
-        articles = config.get('articles', {})
-        
-        # Get League Theme or fallback
-        theme_league = config.get('theme_league', {})
-        if not theme_league: theme_league = config.get('theme', {})
+    league_tasks = plan_league_pages(config) if 'league' in templates and not matches_only else []
 
-        domain = config.get('site_settings', {}).get('domain', 'example.com')
+    # League pages are written after custom pages, so on a slug clash the
+    # league page wins. Keep that by dropping earlier tasks for the same slug.
+    last_index = {t['slug']: i for i, t in enumerate(page_tasks + league_tasks)}
+    ordered = [t for i, t in enumerate(page_tasks + league_tasks) if last_index[t['slug']] == i]
 
-        # Templates from Admin
-        tpl_h1 = articles.get('league_h1', 'Watch {{NAME}} Live Streams')
-        tpl_intro = articles.get('league_intro', 'Best free {{NAME}} streams online.')
-        tpl_live_title = articles.get('league_live_title', 'Live {{NAME}} Matches')
-        tpl_upcoming_title = articles.get('league_upcoming_title', 'Upcoming {{NAME}} Schedule')
+    # ==========================================
+    # 6. PER-MATCH WATCH PAGES
+    # ==========================================
+    match_tasks = plan_match_pages(config)
+    taken = {t['slug'] for t in ordered}
+    ordered += [t for t in match_tasks or [] if t['slug'] not in taken]
 
-        for name, data in priorities.items():
-            if name.startswith('_') or not data.get('hasLink'): continue
-            
-            slug = normalize_key(name) + "-streams"
-            is_league = data.get('isLeague', False)
-            
-            # Entity Intelligence (Parent Sport)
-            parent_sport = LEAGUE_PARENT_MAP.get(name)
-            if not parent_sport:
-                lower_name = name.lower()
-                if "football" in lower_name or "soccer" in lower_name: parent_sport = "Soccer"
-                elif "basket" in lower_name: parent_sport = "Basketball"
-                elif "fight" in lower_name: parent_sport = "Combat Sports"
-                elif "racing" in lower_name or "motor" in lower_name: parent_sport = "Motorsport"
-                else: parent_sport = name
-
-            # 1. Prepare Variables
-            vars_map = {'{{NAME}}': name, '{{SPORT}}': parent_sport, '{{YEAR}}': "2025", '{{DOMAIN}}': config['site_settings']['domain']}
-            
-            def replace_vars(text, v_map):
-                if not text: return ""
-                for k, v in v_map.items():
-                    text = text.replace(k, v)
-                return text
-
-            # 2. Define Content & TITLES (Fixes Title Issue)
-            p_h1 = replace_vars(articles.get('league_h1', 'Watch {{NAME}} Live'), vars_map)
-            p_intro = replace_vars(articles.get('league_intro', ''), vars_map)
-            
-            # Process Section Titles (NEW FIX)
-            sec_live = replace_vars(articles.get('league_live_title', 'Live {{NAME}}'), vars_map)
-            sec_upc = replace_vars(articles.get('league_upcoming_title', 'Upcoming {{NAME}}'), vars_map)
-            
-            raw_art = articles.get('league', '') if is_league else articles.get('sport', '')
-            final_art = replace_vars(raw_art, vars_map)
-
-            # 3. PAGE DATA Construction
-            page_data = {
-                'title': p_h1, 
-                'meta_title': p_h1,
-                'meta_desc': p_intro, 
-                'hero_h1': p_h1, 
-                'hero_text': p_intro,
-                'canonical_url': f"https://{config['site_settings']['domain']}/{slug}/",
-                'slug': slug, 
-                'layout': 'league', 
-                'content': final_art,
-                'meta_keywords': f"{name} stream, watch {name} free, {name} live",
-                'schemas': {'org': True, 'website': True}
-            }
+    # Incremental: only render pages whose inputs changed since the last build
+    manifest = BuildManifest(MANIFEST_PATH, root=OUTPUT_DIR, force=force)
+    shared_hash = build_fingerprint(config)
+    template_hashes = {name: hash_bytes(t.source.encode('utf-8')) for name, t in templates.items()}
+    todo = []
+    for task in ordered:
+        task['inputs'] = task_fingerprint(task, template_hashes, shared_hash)
+        if manifest.is_fresh(page_path(task['slug']), task['inputs']):
+            manifest.skip(page_path(task['slug']))
+        else:
+            todo.append(task)
 
-            # 4. Render
-            html = render_page(league_template_content, config, page_data, theme_override=theme_league)
-            
-            # 5. Injections (Fixes Placeholder Issue)
-            html = html.replace('{{PAGE_FILTER}}', name)
-            html = html.replace('{{LEAGUE_ARTICLE}}', final_art)
-            html = html.replace('{{TEXT_LIVE_SECTION_TITLE}}', sec_live) # Inject Processed Title
-            html = html.replace('{{TEXT_UPCOMING_TITLE}}', sec_upc)      # Inject Processed Title
-            html = html.replace('{{HERO_PILLS}}', build_menu_html(config.get('menus', {}).get('hero', []), 'hero'))
-            
-            # 6. Write File
-            out_dir = os.path.join(OUTPUT_DIR, slug)
-            os.makedirs(out_dir, exist_ok=True)
-            with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
-                f.write(html)
-            
-            print(f"   -> Built: {slug} (Filter: {name})")
+    instrument.add('pages_skipped', len(ordered) - len(todo))
+    instrument.mark('render')
+    render_started = time.perf_counter()
+    league_started = False
+    sizes = []
+    for task, (output_hash, written, size) in run_tasks(todo, config, templates, jobs):
+        manifest.record(page_path(task['slug']), task['inputs'], output_hash, written)
+        sizes.append((task['slug'],) + size)
+        instrument.add('pages_rendered')
+        if written: instrument.add('bytes_written', size[1])
+        if task['template'] == 'league' and not league_started:
+            print("🏆 Building League Pages...")
+            league_started = True
+        if task['log']: print(task['log'])
+    if not league_started: print("🏆 Building League Pages...")
+    render_ms = round((time.perf_counter() - render_started) * 1000, 1)
+
+    instrument.mark('finalize')
+
+    # Matches that left the feed: drop their pages (only with a snapshot to compare against)
+    if match_tasks is not None:
+        keep = [page_path(t['slug']) for t in ordered] + [page_path(p.get('slug')) for p in config.get('pages', []) if p.get('slug')]
+        expired = manifest.prune(f"{match_snapshot.WATCH_DIR}/", keep)
+        print(f"🎟️ Match pages: {len(match_tasks)} live, {sum(1 for t in todo if t['page'].get('match_id'))} (re)rendered, {len(expired)} expired")
+
+    manifest.save()
+    manifest.report()
+    image_map_report(ordered, templates, config)
+    if config['_minify']: minify_report(sizes)
+
+    # Stylesheets no page links any more (theme edits) are deleted. Only
+    # written / removed pages can change that set, so a no-op build skips the scan.
+    if manifest.rebuilt or manifest.removed or force:
+        linked_css = theme_css.linked(os.path.join(OUTPUT_DIR, key) for key in manifest.entries)
+        theme_css.report(linked_css, theme_css.collect_garbage(linked_css))
+        # Same for versioned maps, except this run's (not every caller renders pages)
+        used_maps = map_assets.referenced((os.path.join(OUTPUT_DIR, key) for key in manifest.entries),
+                                          [json.dumps(config['_image_map_src']), config['_league_map_src']])
+        stale_maps = map_assets.collect_garbage(used_maps)
+        if stale_maps: print(f"🗺️ Maps: {len(stale_maps)} versions no page references removed")
 
     print("✅ Build Complete.")
+    return {'rebuilt': manifest.rebuilt, 'unchanged': len(manifest.unchanged), 'skipped': len(manifest.skipped),
+            'removed': manifest.removed, 'render_ms': render_ms}
 
 if __name__ == "__main__":
-    build_site()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build static pages from data/config.json")
+    parser.add_argument('--jobs', '-j', type=int, default=1, help="Render pages across N worker processes (0 = all cores)")
+    parser.add_argument('--force', action='store_true', help="Ignore the build manifest and re-render every page")
+    parser.add_argument('--image-map', choices=IMAGE_MAP_MODES, default='external',
+                        help="external: one hashed JSON file, sharded: hashed files per name prefix, inline: embed in every page")
+    parser.add_argument('--matches-only', action='store_true', help="Only refresh the per-match watch pages (cron deploys)")
+    parser.add_argument('--theme-css', choices=theme_css.MODES, default='external',
+                        help="external: link one hashed stylesheet per theme, critical: inline above-the-fold rules + load it async, inline: embed in every page")
+    parser.add_argument('--minify', action='store_true', help="Strip comments / collapse whitespace / compact JSON in the written pages")
+    args = parser.parse_args()
+    instrument.start('build_site')
+    build_site(jobs=args.jobs if args.jobs > 0 else (os.cpu_count() or 1), force=args.force, image_map_mode=args.image_map,
+               matches_only=args.matches_only, theme_css_mode=args.theme_css, minify=args.minify)
+    instrument.finish()
@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import instrument
+
+# ==========================================
+# SHARED MATCH FEED CLIENT
+# ==========================================
+# build_engine.py, fetch_streamed.py and generate_map.py all read the same
+# sync-nodes feed. This client:
+#   - reuses the on-disk copy if it is younger than FEED_FRESH_SECONDS, so a
+#     pipeline run downloads the feed once, not three times;
+#   - otherwise asks for gzip and sends If-None-Match / If-Modified-Since;
+#   - persists every good payload with its timestamp;
+#   - serves that copy when the upstream is slow or down, as long as it is
+#     younger than FEED_MAX_STALE_SECONDS.
+# The cache dir is gitignored, so a fresh CI checkout has no copy. There the
+# last resort is the committed match snapshot (assets/data/matches.json,
+# scripts/match_snapshot.py) under the same age budget: it keeps the raw
+# match fields, though not the badge ones.
+FEED_URL = "https://vercelapi-olive.vercel.app/api/sync-nodes?country=us"
+CACHE_DIR = 'assets/data/cache/feed'
+SNAPSHOT_PATH = 'assets/data/matches.json'
+FRESH_SECONDS = int(os.environ.get('FEED_FRESH_SECONDS', 300))
+MAX_STALE_SECONDS = int(os.environ.get('FEED_MAX_STALE_SECONDS', 6 * 3600))
+TIMEOUT = float(os.environ.get('FEED_TIMEOUT', 15))
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip',
+}
+
+
+def _cache_path(url, cache_dir):
+    return os.path.join(cache_dir, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.json")
+
+
+def _load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _store(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def fetch_feed(url=FEED_URL, cache_dir=CACHE_DIR, fresh=FRESH_SECONDS, max_stale=MAX_STALE_SECONDS,
+               timeout=TIMEOUT, context=None, snapshot_path=SNAPSHOT_PATH):
+    """
+    Returns (payload, source, age_seconds). `source` is one of 'cache',
+    'network', 'not-modified', 'stale', 'snapshot' or 'none' (payload is then None).
+    """
+    path = _cache_path(url, cache_dir)
+    entry = _load(path)
+    if entry and entry.get('url') != url: entry = None
+    age = time.time() - entry['fetched_at'] if entry else None
+    if entry and age < fresh:
+        return entry['payload'], 'cache', age
+
+    headers = dict(HEADERS)
+    if entry and entry.get('etag'): headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+
+    started = time.perf_counter()
+    try:
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, context=context, timeout=timeout) as response:
+            body = response.read()
+            instrument.record_http(time.perf_counter() - started, len(body))
+            if response.headers.get('Content-Encoding', '').lower() == 'gzip':
+                body = gzip.decompress(body)
+            payload = json.loads(body.decode('utf-8'))
+            _store(path, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'payload': payload,
+            })
+            return payload, 'network', 0.0
+    except urllib.error.HTTPError as e:
+        instrument.record_http(time.perf_counter() - started, ok=e.code == 304)
+        if e.code == 304 and entry:
+            entry['fetched_at'] = time.time()
+            _store(path, entry)
+            return entry['payload'], 'not-modified', 0.0
+        error = e
+    except Exception as e:
+        instrument.record_http(time.perf_counter() - started, ok=False)
+        error = e
+
+    # Upstream slow / down / garbage: fall back to the last good copy within budget
+    if entry and age < max_stale:
+        print(f"⚠️ Feed unavailable ({error}). Using copy from {age / 60:.0f} min ago.")
+        return entry['payload'], 'stale', age
+    snapshot = _load(snapshot_path) if snapshot_path else None
+    if isinstance(snapshot, dict) and snapshot.get('generated_at'):
+        snapshot_age = time.time() - snapshot['generated_at'] / 1000
+        if snapshot_age < max_stale:
+            print(f"⚠️ Feed unavailable ({error}). Using the committed snapshot from {snapshot_age / 60:.0f} min ago.")
+            return {'matches': snapshot.get('matches', [])}, 'snapshot', snapshot_age
+    print(f"❌ Feed unavailable ({error}) and no copy within FEED_MAX_STALE_SECONDS.")
+    return None, 'none', age
+
+
+def seed_cache(url, payload, cache_dir=CACHE_DIR):
+    """
+    Stores `payload` as a fresh copy of `url`, so the next fetch is a cache hit (offline runs, benchmarks).
+    """
+    _store(_cache_path(url, cache_dir), {'url': url, 'etag': None, 'last_modified': None,
+                                          'fetched_at': time.time(), 'payload': payload})
+
+
+def fetch_matches(url=FEED_URL, with_source=False, **kwargs):
+    """
+    The feed's match list ([] if nothing usable is available); (matches, source) with `with_source`.
+    """
+    payload, source, age = fetch_feed(url, **kwargs)
+    matches = (payload or {}).get('matches', []) if isinstance(payload, dict) else []
+    if source in ('cache', 'not-modified'):
+        print(f"📦 Feed: {len(matches)} matches ({source}, {age or 0:.0f}s old)")
+    elif source == 'network':
+        print(f"🌍 Feed: {len(matches)} matches (downloaded)")
+    return (matches, source) if with_source else matches
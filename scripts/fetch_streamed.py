@@ -1,9 +1,13 @@
 import os
 import requests
 import re
-import time
-from PIL import Image
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+from feed_client import fetch_feed
+from image_pipeline import ImagePipeline
+from logo_store import LogoStore
+from normalize import clean_display_name
 
 # ==========================================
 # 1. CONFIGURATION
@@ -11,29 +15,19 @@ from io import BytesIO
 BACKEND_URL = "https://vercelapi-olive.vercel.app/api/sync-nodes?country=us"
 STREAMED_HASH_BASE = "https://streamed.pk/api/images/badge/"
 
-# Directories
-TSDB_DIR = "assets/logos/tsdb"
-STREAMED_DIR = "assets/logos/streamed"
-LEAGUE_DIR = "assets/logos/leagues"
+# Logo store kinds (keys are "<kind>/<slug>")
+TSDB_KIND = "tsdb"
+STREAMED_KIND = "streamed"
+LEAGUE_KIND = "leagues"
 
 # REFRESH SETTINGS
 REFRESH_DAYS = 60
+WORKERS = int(os.environ.get('STREAMED_WORKERS', 8))  # Download threads
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-# --- WHITELIST FOR CLEANING ONLY ---
-ALLOWED_LEAGUES_INPUT = """
-NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball, 
-NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League, 
-Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American-Football, American Football, 
-Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership, 
-Europa League, Europa-League, A League, A-League, A League Men, A League Women, 
-Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
-"""
-VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
-
 # ==========================================
 # 2. UTILS
 # ==========================================
@@ -44,124 +38,104 @@ def slugify(name):
     clean = re.sub(r"\s+", "-", clean)
     return clean.strip("-")
 
-def clean_display_name(name):
-    """
-    Sanitizer: Priority Colon Rule -> Whitelist Fallback
-    """
-    if not name: return None
-    
-    # Rule 1: Colon
-    if ':' in name:
-        parts = name.split(':', 1)
-        if len(parts) > 1:
-            cleaned = parts[1].strip()
-            if cleaned and len(cleaned) > 1:
-                return cleaned
-
-    # Rule 2: Whitelist
-    lower_name = name.lower()
-    for league in VALID_LEAGUES:
-        if lower_name.startswith(league):
-            remainder = name[len(league):]
-            clean_remainder = re.sub(r"^[\s-]+", "", remainder)
-            if clean_remainder and len(clean_remainder.strip()) > 1:
-                return clean_remainder.strip()
-                
-    return name.strip()
-
 def resolve_url(source_val):
     if not source_val: return None
     if source_val.startswith("http"):
         return source_val
     return f"{STREAMED_HASH_BASE}{source_val}.webp"
 
-def should_download(path):
-    if not os.path.exists(path): return True
-    file_age_days = (time.time() - os.path.getmtime(path)) / (24 * 3600)
-    return file_age_days > REFRESH_DAYS
-
-def download_multi_source(source_obj, save_path):
-    if not should_download(save_path): return False
-    
-    urls = []
-    if isinstance(source_obj, dict):
-        urls = list(source_obj.values())
-    elif isinstance(source_obj, list):
-        urls = source_obj
-    elif isinstance(source_obj, str):
-        urls = [source_obj]
+def source_urls(source_obj):
+    if isinstance(source_obj, dict): return list(source_obj.values())
+    if isinstance(source_obj, list): return source_obj
+    if isinstance(source_obj, str): return [source_obj]
+    return []
 
+def download_multi_source(urls, key, session, pipeline, store):
+    # Download here, resize + encode in the pipeline's process pool.
+    # A source that fails to download OR decode falls through to the next one.
     for raw_url in urls:
         final_url = resolve_url(raw_url)
         if not final_url: continue
 
         try:
-            resp = requests.get(final_url, headers=HEADERS, timeout=8)
-            if resp.status_code == 200:
-                img = Image.open(BytesIO(resp.content))
-                if img.mode != 'RGBA': img = img.convert('RGBA')
-                img = img.resize((60, 60), Image.Resampling.LANCZOS)
-                
-                temp_buffer = BytesIO()
-                img.save(temp_buffer, "WEBP", quality=90, method=6)
-                
-                with open(save_path, "wb") as f:
-                    f.write(temp_buffer.getvalue())
+            resp = session.get(final_url, headers=HEADERS, timeout=8)
+            webp = pipeline.process(resp.content, key) if resp.status_code == 200 else None
+            if webp:
+                store.put(key, webp)
                 return True
         except:
             continue
     return False
 
-# ==========================================
-# 3. MAIN EXECUTION
-# ==========================================
-def main():
-    os.makedirs(STREAMED_DIR, exist_ok=True)
-    os.makedirs(LEAGUE_DIR, exist_ok=True)
-    
-    print("--- Starting Backend Asset Sync (All Teams) ---")
-    
-    try:
-        data = requests.get(BACKEND_URL, headers=HEADERS).json()
-        matches = data.get('matches', [])
-    except Exception as e:
-        print(f"CRITICAL: Backend unavailable - {e}")
-        return
-
-    team_count = 0
-    league_count = 0
+def collect_jobs(matches, store):
+    """
+    {store_key: [source urls]} for stale logos. A team or league seen in many
+    matches becomes ONE job (its sources from every match kept as fallbacks).
+    """
+    jobs = {}
+    def add(key, source_obj):
+        if key not in jobs and not store.should_download(key, REFRESH_DAYS): return
+        urls = jobs.setdefault(key, [])
+        urls += [u for u in source_urls(source_obj) if u not in urls]
 
     for m in matches:
-        home_raw = m.get('home_team')
-        away_raw = m.get('away_team')
-        league_raw = m.get('league') 
-        
-        home_imgs = m.get('home_team_image')
-        away_imgs = m.get('away_team_image')
-        league_imgs = m.get('league_image')
-
         # PROCESS TEAMS
-        for raw_name, img_obj in [(home_raw, home_imgs), (away_raw, away_imgs)]:
+        for raw_name, img_obj in [(m.get('home_team'), m.get('home_team_image')),
+                                  (m.get('away_team'), m.get('away_team_image'))]:
             name = clean_display_name(raw_name)
             slug = slugify(name)
-            if not slug: continue
+            if not slug or not img_obj: continue
 
             # Check TSDB first
-            tsdb_path = os.path.join(TSDB_DIR, f"{slug}.webp")
-            if not os.path.exists(tsdb_path):
-                streamed_path = os.path.join(STREAMED_DIR, f"{slug}.webp")
-                if img_obj and download_multi_source(img_obj, streamed_path):
-                    team_count += 1
+            if not store.has(f"{TSDB_KIND}/{slug}"):
+                add(f"{STREAMED_KIND}/{slug}", img_obj)
 
         # PROCESS LEAGUE IMAGE
+        league_raw = m.get('league')
+        league_imgs = m.get('league_image')
         if league_raw and league_imgs:
             l_slug = slugify(league_raw)
-            if l_slug:
-                l_path = os.path.join(LEAGUE_DIR, f"{l_slug}.webp")
-                if download_multi_source(league_imgs, l_path):
-                    league_count += 1
+            if l_slug: add(f"{LEAGUE_KIND}/{l_slug}", league_imgs)
+    return jobs
+
+# ==========================================
+# 3. MAIN EXECUTION
+# ==========================================
+def main():
+    print("--- Starting Backend Asset Sync (All Teams) ---")
+    instrument.mark('feed')
+    data, source, _ = fetch_feed(BACKEND_URL)
+    if data is None:
+        print("CRITICAL: Backend unavailable and no cached feed")
+        return
+    matches = data.get('matches', [])
+    print(f" > {len(matches)} matches ({source})")
+
+    instrument.mark('collect')
+    store = LogoStore()
+    jobs = [(key, urls) for key, urls in collect_jobs(matches, store).items() if urls]
+    print(f" > {len(jobs)} logos to refresh")
+
+    instrument.mark('download')
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(1, WORKERS))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(instrument.requests_hook)
+    with ImagePipeline() as pipeline, ThreadPoolExecutor(max_workers=max(1, WORKERS)) as ex:
+        done = list(ex.map(lambda job: (job[0], download_multi_source(job[1], job[0], session, pipeline, store)), jobs))
+    session.close()
+    instrument.mark('save')
+    store.save()
+
+    team_count = sum(1 for key, ok in done if ok and key.startswith(STREAMED_KIND + '/'))
+    league_count = sum(1 for key, ok in done if ok and key.startswith(LEAGUE_KIND + '/'))
+    pipeline.report()
+    instrument.add('logos_updated', team_count + league_count)
 
     print(f"--- Sync Done. Teams: {team_count} | Leagues: {league_count} ---")
 
 if __name__ == "__main__":
+    instrument.start('fetch_streamed')
     main()
+    instrument.finish()
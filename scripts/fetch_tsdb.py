@@ -2,18 +2,30 @@ import os
 import requests
 import urllib.parse
 import re
-import time
-from PIL import Image
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import instrument
+from http_pool import RateLimiter
+from image_pipeline import ImagePipeline
+from logo_store import LogoStore
+from response_cache import ResponseCache
 
 # ==========================================
 # 1. CONFIGURATION
 # ==========================================
 API_KEY = "123" # Replace with valid key
 BASE_URL = f"https://www.thesportsdb.com/api/v1/json/{API_KEY}"
-SAVE_DIR = "assets/logos/tsdb"
+LOGO_KIND = "tsdb"  # Logo store keys: tsdb/<slug>
+CACHE_DIR = "assets/data/cache/tsdb"
 REFRESH_DAYS = 60
 
+# Harvester: the free API allows ~1 call per 1.2 s. A token bucket enforces
+# that instead of sleeping after every league, so badge downloads overlap.
+API_RATE = float(os.environ.get('TSDB_API_RATE', 1 / 1.2))  # Calls/second
+WORKERS = int(os.environ.get('TSDB_WORKERS', 8))  # Badge downloads
+LOOKUP_WORKERS = 2  # Rate-limited anyway: one waits on the limiter while the other reads a response
+CACHE_TTL_HOURS = float(os.environ.get('TSDB_CACHE_TTL_HOURS', 24))
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
@@ -66,76 +78,106 @@ def slugify(name):
     clean = re.sub(r"\s+", "-", clean)
     return clean.strip("-")
 
-def should_download(path):
-    if not os.path.exists(path): return True
-    file_age_days = (time.time() - os.path.getmtime(path)) / (24 * 3600)
-    return file_age_days > REFRESH_DAYS
-
-def save_image_optimized(url, save_path):
+def save_image_optimized(url, key, session, pipeline, store):
+    # Download here, resize + encode in the pipeline's process pool, file by content hash
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
+        resp = session.get(url, headers=HEADERS, timeout=10)
         if resp.status_code == 200:
-            img = Image.open(BytesIO(resp.content))
-            if img.mode != 'RGBA': img = img.convert('RGBA')
-            img = img.resize((60, 60), Image.Resampling.LANCZOS)
-            
-            temp_buffer = BytesIO()
-            img.save(temp_buffer, "WEBP", quality=90, method=6)
-            
-            with open(save_path, "wb") as f:
-                f.write(temp_buffer.getvalue())
-            return True
+            webp = pipeline.process(resp.content, key)
+            if webp:
+                store.put(key, webp)
+                return True
     except: 
         pass
     return False
 
+def trim_teams(data):
+    """
+    Keeps only what the harvester reads, so the cached responses stay small.
+    """
+    return [{'strTeam': t.get('strTeam'), 'strTeamBadge': t.get('strTeamBadge') or t.get('strBadge')}
+            for t in (data or {}).get('teams') or []]
+
+def fetch_league(session, cache, limiter, tsdb_name):
+    encoded = urllib.parse.quote(tsdb_name)
+    url = f"{BASE_URL}/search_all_teams.php?l={encoded}"
+    return cache.get_json(session, url, tsdb_name, trim=trim_teams, limiter=limiter, headers=HEADERS)
+
+def badge_jobs(teams, store):
+    """
+    (badge_url, store_key) for every team whose logo is missing or stale.
+    """
+    jobs = []
+    for t in teams:
+        slug = slugify(t.get('strTeam'))
+        badge = t.get('strTeamBadge')
+        # Note: NO league_map logic here.
+        if slug and badge:
+            key = f"{LOGO_KIND}/{slug}"
+            if store.should_download(key, REFRESH_DAYS): jobs.append((badge, key))
+    return jobs
+
 # ==========================================
 # 3. MAIN EXECUTION
 # ==========================================
-def main():
-    os.makedirs(SAVE_DIR, exist_ok=True)
+def main(workers=WORKERS):
     print("--- Starting TSDB Harvester (Image Only) ---")
+    instrument.mark('harvest')
 
+    # Whitelist Check (several display names share one TSDB query)
+    queries = {}
     for display_name, tsdb_name in LEAGUES.items():
-        # Whitelist Check
-        if display_name.lower() not in VALID_LEAGUES:
-            continue
-
-        print(f" > Checking: {display_name}")
-        encoded = urllib.parse.quote(tsdb_name)
-        url = f"{BASE_URL}/search_all_teams.php?l={encoded}"
-        
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=10)
-            data = resp.json()
-            
-            if data and data.get('teams'):
-                count = 0
-                for t in data['teams']:
-                    name = t.get('strTeam')
-                    if name:
-                        slug = slugify(name)
-                        if slug:
-                            # Note: NO league_map logic here.
-                            
-                            # Download Image
-                            badge = t.get('strTeamBadge') or t.get('strBadge')
-                            if badge:
-                                path = os.path.join(SAVE_DIR, f"{slug}.webp")
-                                if should_download(path):
-                                    if save_image_optimized(badge, path):
-                                        count += 1
-                
-                if count > 0: print(f"   [+] Processed {count} updates.")
-            else:
-                print(f"   [-] No teams found for {tsdb_name}")
-
-        except Exception as e:
-            print(f"   [!] Error: {e}")
-        
-        time.sleep(1.2)
-    
+        if display_name.lower() in VALID_LEAGUES:
+            queries.setdefault(tsdb_name, display_name)
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(1, workers))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(instrument.requests_hook)
+    cache = ResponseCache(CACHE_DIR, ttl=CACHE_TTL_HOURS * 3600)
+    limiter = RateLimiter(API_RATE, burst=1)
+    store = LogoStore()
+    states = {}
+
+    # Lookups and badge downloads get separate pools: lookups queue on the rate
+    # limiter, so in a shared pool the downloads would wait behind all of them.
+    # A league's badges are submitted as soon as its lookup returns and
+    # download while the next leagues are still being fetched.
+    with ImagePipeline() as pipeline, ThreadPoolExecutor(max_workers=LOOKUP_WORKERS) as lookup_ex, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        lookups = {lookup_ex.submit(fetch_league, session, cache, limiter, q): (q, name) for q, name in queries.items()}
+        downloads = []
+        for fut in as_completed(lookups):
+            tsdb_name, display_name = lookups[fut]
+            try:
+                teams, state = fut.result()
+            except Exception as e:
+                print(f" > {display_name}: [!] Error: {e}")
+                continue
+            states[state] = states.get(state, 0) + 1
+            if not teams:
+                print(f" > {display_name}: [-] No teams found for {tsdb_name}")
+                continue
+            jobs = badge_jobs(teams, store)
+            print(f" > {display_name}: {len(teams)} teams ({state}), {len(jobs)} badges to refresh")
+            downloads += [(display_name, ex.submit(save_image_optimized, badge, key, session, pipeline, store)) for badge, key in jobs]
+
+        counts = {}
+        for display_name, fut in downloads:
+            if fut.result(): counts[display_name] = counts.get(display_name, 0) + 1
+    session.close()
+    instrument.mark('save')
+    store.save()
+    pipeline.report()
+    instrument.add('logos_updated', sum(counts.values()))
+
+    for display_name, count in counts.items():
+        print(f"   [+] {display_name}: Processed {count} updates.")
+    print("   Responses: " + ", ".join(f"{n} {k}" for k, n in sorted(states.items())))
     print("--- TSDB Sync Complete ---")
 
 if __name__ == "__main__":
+    instrument.start('fetch_tsdb')
     main()
+    instrument.finish()
@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import chain
+from difflib import SequenceMatcher
+
+# ==========================================
+# INDEXED FUZZY MATCHER
+# ==========================================
+# Drop-in for difflib.get_close_matches(word, slugs, n=1, cutoff=c) that
+# returns the SAME best match without scoring every slug:
+#   1. Length: real_quick_ratio() >= cutoff bounds the candidate length.
+#   2. Inverted index of (char, n-th occurrence) tokens per slug length.
+#      Counting how many of the word's tokens each slug's postings contain
+#      (Counter over the posting lists, a C loop) gives exactly the shared
+#      character count quick_ratio() uses, so slugs below the cutoff are
+#      dropped before any SequenceMatcher work.
+#   3. Survivors go through difflib's own real_quick/quick/ratio checks,
+#      and ties are broken like get_close_matches (highest ratio, then
+#      highest string).
+# Steps 1-2 only drop slugs difflib would reject, so results are identical.
+CACHE_PATH = 'assets/data/cache/fuzzy_matches.json'
+
+
+def _tokens(word):
+    seen = Counter()
+    out = []
+    for c in word:
+        seen[c] += 1
+        out.append((c, seen[c]))
+    return out
+
+
+class FuzzyIndex:
+    def __init__(self, slugs, cutoff=0.6):
+        self.cutoff = cutoff
+        self.slugs = list(dict.fromkeys(slugs))
+        self.lengths = set()
+        self.postings = {}  # (length, (char, n)) -> slug ids
+        for i, s in enumerate(self.slugs):
+            self.lengths.add(len(s))
+            for tok in _tokens(s):
+                self.postings.setdefault((len(s), tok), []).append(i)
+
+    def _length_range(self, la):
+        # 2*min(la, lb) / (la + lb) >= cutoff  (one slack on each side for float safety)
+        c = self.cutoff
+        lo = int(c * la / (2 - c)) - 1
+        hi = int(la * (2 - c) / c) + 1 if c > 0 else max(self.lengths, default=0)
+        return max(0, lo), hi
+
+    def candidates(self, word):
+        la = len(word)
+        lo, hi = self._length_range(la)
+        toks = _tokens(word)
+        out = []
+        for lb in range(lo, hi + 1):
+            if lb not in self.lengths: continue
+            # Shared chars needed for quick_ratio() >= cutoff (one slack for float safety)
+            need = self.cutoff * (la + lb) / 2 - 1
+            shared = Counter(chain.from_iterable(self.postings.get((lb, t), ()) for t in toks))
+            out += [self.slugs[i] for i, n in shared.items() if n >= need]
+        return out
+
+    def best(self, word):
+        """
+        (slug, ratio) of the closest slug at or above the cutoff, or (None, 0.0).
+        """
+        s = SequenceMatcher()
+        s.set_seq2(word)
+        best = (0.0, None)
+        for x in self.candidates(word):
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= self.cutoff and s.quick_ratio() >= self.cutoff:
+                r = s.ratio()
+                if r >= self.cutoff and (r, x) > best:
+                    best = (r, x)
+        return best[1], best[0]
+
+
+class MatchCache:
+    """
+    Persists resolved names across runs. When the slug set changes, cached
+    answers are only re-checked against the added slugs, and names whose
+    match disappeared are resolved again.
+    """
+    def __init__(self, slugs, cutoff, path=CACHE_PATH):
+        self.path = path
+        self.cutoff = cutoff
+        self.slugs = set(slugs)
+        self.index = FuzzyIndex(slugs, cutoff)
+        self.matches = {}
+        self.hits = self.misses = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get('cutoff') != self.cutoff: return
+        old_slugs = set(data.get('slugs', []))
+        added = self.slugs - old_slugs
+        removed = old_slugs - self.slugs
+        added_index = FuzzyIndex(sorted(added), self.cutoff) if added else None
+        for word, (match, ratio) in data.get('matches', {}).items():
+            if match in removed: continue
+            if added_index:
+                new_match, new_ratio = added_index.best(word)
+                if new_match and (new_ratio, new_match) > (ratio, match or ''):
+                    match, ratio = new_match, new_ratio
+            self.matches[word] = (match, ratio)
+        self._dirty = bool(added or removed)
+
+    def best(self, word):
+        if word in self.matches:
+            self.hits += 1
+            return self.matches[word][0]
+        self.misses += 1
+        match, ratio = self.index.best(word)
+        self.matches[word] = (match, ratio)
+        self._dirty = True
+        return match
+
+    def save(self):
+        if not self._dirty: return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'cutoff': self.cutoff, 'slugs': sorted(self.slugs),
+                       'matches': dict(sorted(self.matches.items()))}, f, indent=0)
+
+
+# ==========================================
+# BENCHMARK: python scripts/fuzzy_index.py [n_queries]
+# ==========================================
+def _bench_queries(slugs, n):
+    # Realistic misses: dropped / swapped / extra characters and club suffixes
+    import random
+    rnd = random.Random(42)
+    out = []
+    for s in rnd.sample(slugs, min(n, len(slugs))):
+        i = rnd.randrange(len(s))
+        op = rnd.randrange(5)
+        if op == 0: out.append(s[:i] + s[i + 1:])
+        elif op == 1 and i + 1 < len(s): out.append(s[:i] + s[i + 1] + s[i] + s[i + 2:])
+        elif op == 2: out.append(s[:i] + rnd.choice('aeiou') + s[i:])
+        elif op == 3: out.append(s + rnd.choice(['-fc', '-sc', '-women', '-u21']))
+        else: out.append('-'.join(reversed(s.split('-'))))
+    return out
+
+
+def benchmark(n=300, cutoff=0.85):
+    from difflib import get_close_matches
+    from logo_store import LogoStore
+
+    # Same slug set generate_map.py matches against (TSDB + Streamed logos)
+    store = LogoStore()
+    slugs = list(store.slugs('tsdb'))
+    slugs += [s for s in store.slugs('streamed') if s not in set(slugs)]
+    queries = _bench_queries(slugs, n)
+    print(f"--- Fuzzy match benchmark: {len(queries)} names vs {len(slugs)} slugs (cutoff {cutoff}) ---")
+
+    t = time.perf_counter()
+    expected = [(get_close_matches(q, slugs, n=1, cutoff=cutoff) or [None])[0] for q in queries]
+    t_difflib = time.perf_counter() - t
+
+    t = time.perf_counter()
+    index = FuzzyIndex(slugs, cutoff)
+    t_build = time.perf_counter() - t
+    t = time.perf_counter()
+    got = [index.best(q)[0] for q in queries]
+    t_index = time.perf_counter() - t
+
+    mismatches = [(q, e, g) for q, e, g in zip(queries, expected, got) if e != g]
+    print(f"   difflib: {t_difflib * 1000:.0f} ms ({t_difflib / len(queries) * 1000:.2f} ms/name)")
+    print(f"   index:   {t_index * 1000:.0f} ms ({t_index / len(queries) * 1000:.2f} ms/name) + {t_build * 1000:.0f} ms build")
+    print(f"   speedup: {t_difflib / max(t_index + t_build, 1e-9):.1f}x | identical results: {len(queries) - len(mismatches)}/{len(queries)}")
+    for q, e, g in mismatches[:10]:
+        print(f"   ❌ {q}: difflib={e} index={g}")
+    return not mismatches
+
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 300) else 1)
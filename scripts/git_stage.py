@@ -0,0 +1,134 @@
+import glob
+import os
+import subprocess
+import time
+
+from build_manifest import clear_pending, pending_outputs
+
+# ==========================================
+# MANIFEST-DRIVEN GIT STAGING (deploys)
+# ==========================================
+# A deploy used to run "git add ." over the whole site (~8,000 logos, ~700
+# pages) and re-untrack every CMS folder with one process each. Instead:
+#   - the pages the builds wrote or deleted since the last deploy (the
+#     build manifest's pending list) plus their .gz / .br siblings, and the
+#     small shared outputs in SHARED_PATHS, are staged with ONE "git add"
+#     over a pathspec list (and one "git rm --cached" for deleted files);
+#   - tracked files edited outside the builds (root files, scripts, ...)
+#     follow in one "git add -u"; new files outside those paths are listed
+#     as a warning, not silently left behind;
+#   - local-only files (LOCAL_PATHS: debug dumps, launchers, notes) are
+#     ignored by the committed .gitignore and untracked once if an older
+#     commit still has them. Source folders (admin/, server/, core/) stay
+#     tracked: deploy.yml runs core/build_engine.py from the repo.
+# Without a pending list (no build recorded one yet) everything is staged
+# as before. DEPLOY_STAGE_ALL=1 forces that, e.g. after hand edits.
+LOCAL_PATHS = ['_debug', 'Start_CMS.bat', 'Start_Admin.bat', 'cron_setup.md', 'cron_api_guide.md',
+               'walkthrough.md', 'implementation_plan.md', 'task.md']  # Same as the .gitignore block
+SHARED_PATHS = ['data/config.json', 'assets/data', 'assets/css', 'assets/logos', 'assets/*_template.html']
+SIBLING_EXTS = ('.gz', '.br')  # scripts/precompress.py
+OLD_EXCLUDE_HEADER = '# CMS-only paths, never deployed (scripts/git_stage.py)'
+STAGE_ALL = os.environ.get('DEPLOY_STAGE_ALL', '') == '1'
+
+
+def _git(git_cmd, args, root, log, paths=None):
+    """
+    Runs one git command; `paths` go through --pathspec-from-file on stdin (no argv limits).
+    """
+    shown = f"git {' '.join(args)}" + (f" <{len(paths)} paths>" if paths is not None else "")
+    if paths is not None:
+        args = args + ['--pathspec-from-file=-', '--pathspec-file-nul']
+    started = time.perf_counter()
+    result = subprocess.run([git_cmd] + args, cwd=root, capture_output=True, text=True,
+                            input='\0'.join(paths) if paths is not None else None)
+    log(f"$ {shown} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+    for line in (result.stdout + result.stderr).splitlines():
+        if line.strip(): log(f"  {line}")
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, [git_cmd] + args, result.stdout, result.stderr)
+    return result
+
+
+def untrack_local_paths(git_cmd, root='.', log=print):
+    """
+    Untracks the local-only paths if any are still tracked (.gitignore keeps them out from then on).
+    """
+    tracked = _git(git_cmd, ['ls-files', '-z', '--'] + LOCAL_PATHS, root, lambda _: None).stdout
+    if tracked:
+        _git(git_cmd, ['rm', '-r', '-q', '--cached', '--ignore-unmatch', '--'] + LOCAL_PATHS, root, log)
+    _drop_old_exclude(root, log)
+
+
+def _drop_old_exclude(root, log):
+    # Earlier versions listed admin/, server/, core/ ... in .git/info/exclude: new
+    # source files there would never be staged, so that block is removed.
+    exclude = os.path.join(root, '.git', 'info', 'exclude')
+    try:
+        with open(exclude, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return
+    if OLD_EXCLUDE_HEADER not in lines: return
+    start = lines.index(OLD_EXCLUDE_HEADER)
+    end = start + 1
+    while end < len(lines) and lines[end].startswith('/'): end += 1
+    with open(exclude, 'w', encoding='utf-8') as f:
+        f.write("".join(f"{line}\n" for line in lines[:start] + lines[end:]))
+    log("Removed the old CMS path block from .git/info/exclude")
+
+
+def changed_paths(root='.'):
+    """
+    (present, deleted) paths to stage, or None when there is no pending list to go by.
+    """
+    pending = pending_outputs(root)
+    if pending is None: return None
+    present, deleted = [], []
+    for key in pending:
+        for path in [key] + [key + ext for ext in SIBLING_EXTS]:
+            (present if os.path.exists(os.path.join(root, path)) else deleted).append(path)
+    for spec in SHARED_PATHS:
+        if glob.glob(os.path.join(root, spec)): present.append(spec)
+    return present, deleted
+
+
+def stage_changes(git_cmd, root='.', log=print, stage_all=STAGE_ALL):
+    """
+    Stages what the builds changed since the last deploy. Returns the number
+    of pathspecs staged (None: the whole tree). Call mark_deployed() after
+    committing, so the next deploy starts from an empty list.
+    """
+    untrack_local_paths(git_cmd, root, log)
+    paths = None if stage_all else changed_paths(root)
+    if paths is None:
+        log("No pending build outputs recorded: staging the whole tree")
+        _git(git_cmd, ['add', '-A', '.'], root, log)
+        return None
+
+    present, deleted = paths
+    if present: _git(git_cmd, ['add', '-A'], root, log, present)
+    # Deleted pages (expired matches): drop them from the index; never-committed ones are ignored
+    if deleted: _git(git_cmd, ['rm', '-r', '-q', '--cached', '--ignore-unmatch'], root, log, deleted)
+    # Everything else already tracked (hand edits, scripts, root files)
+    _git(git_cmd, ['add', '-u'], root, log)
+    log(f"Staged {len(present)} paths, {len(deleted)} deletions")
+
+    untracked = [p for p in _git(git_cmd, ['ls-files', '-z', '-o', '--exclude-standard', '--directory', '--no-empty-directory'],
+                                 root, lambda _: None).stdout.split('\0') if p]
+    if untracked:
+        shown = ', '.join(untracked[:10]) + (f" (+{len(untracked) - 10} more)" if len(untracked) > 10 else "")
+        log(f"⚠️ {len(untracked)} new paths outside the build outputs are NOT deployed: {shown}")
+        log("   Commit them by hand, or deploy with DEPLOY_STAGE_ALL=1.")
+    return len(present) + len(deleted)
+
+
+def mark_deployed(root='.'):
+    clear_pending(root)
+
+
+def has_staged_changes(git_cmd, root='.'):
+    """
+    True if the index differs from HEAD (no working tree scan, unlike "git status").
+    """
+    result = subprocess.run([git_cmd, 'diff', '--cached', '--quiet'], cwd=root, capture_output=True)
+    return result.returncode != 0
@@ -0,0 +1,146 @@
+import json
+import re
+
+# ==========================================
+# HTML MINIFICATION (optional build stage)
+# ==========================================
+# build_site.py --minify and core/build_engine.py --minify run every page
+# through minify() before it is written:
+#   - HTML comments go (conditional "<!--[if" comments stay);
+#   - whitespace runs in text collapse to one character ("\n" if the run
+#     had a line break, else " "), which renders the same;
+#   - <pre>, <textarea> and <script> bodies are left byte for byte, except
+#     JSON scripts (JSON-LD), which are re-serialised compactly;
+#   - <style> bodies lose their indentation and blank lines;
+#   - tags and attribute values are never touched.
+# verify() re-extracts every script and checks it is unchanged (JSON
+# scripts: same parsed value). If that ever fails the page is written
+# unminified, so a minifier bug cannot break a page's JS.
+RAW_TAGS = ('script', 'style', 'pre', 'textarea')
+# A tag runs to the first ">" outside a quoted attribute value (title="a > b", onclick code)
+TAG_BODY = r'(?:[^>"\']|"[^"]*"|\'[^\']*\')*'
+OPEN = re.compile(rf'<(script|style|pre|textarea)\b({TAG_BODY})>|<!--', re.IGNORECASE)
+CLOSE = {tag: re.compile(f"</{tag}", re.IGNORECASE) for tag in RAW_TAGS}
+TAG_OR_SPACE = re.compile(rf'<{TAG_BODY}>|[ \t\n\r\f]+')  # HTML whitespace only: \s would also eat &nbsp; characters
+JSON_TYPES = ('application/ld+json', 'application/json')
+TYPE_ATTR = re.compile(r'''\btype\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+
+
+def dumps(value, compact=False):
+    """
+    json.dumps() for values injected into pages; minified builds drop the separator spaces.
+    """
+    return json.dumps(value, separators=(',', ':')) if compact else json.dumps(value)
+
+
+def _collapse_match(m):
+    run = m.group()
+    if run[0] == '<': return run  # A tag: left as is
+    return '\n' if '\n' in run else ' '
+
+
+def _collapse(text):
+    return TAG_OR_SPACE.sub(_collapse_match, text)
+
+
+def blocks(html):
+    """
+    Yields (start, end, tag, attrs, body) for every raw element and comment
+    (tag '!--', body = comment text), in order. Closing tags are searched
+    for directly, not with a lazy ".*?": bodies are most of a page's bytes.
+    """
+    pos = 0
+    while True:
+        m = OPEN.search(html, pos)
+        if not m: return
+        if m.group(1) is None:
+            close = html.find('-->', m.end())
+            end = len(html) if close < 0 else close + 3
+            yield m.start(), end, '!--', '', html[m.end():close if close >= 0 else len(html)]
+        else:
+            tag = m.group(1)
+            found = CLOSE[tag.lower()].search(html, m.end())
+            if not found:  # Unclosed: the rest of the page is its body
+                yield m.start(), len(html), tag, m.group(2), html[m.end():]
+                return
+            close = found.start()
+            end = html.find('>', close)
+            end = len(html) if end < 0 else end + 1
+            yield m.start(), end, tag, m.group(2), html[m.end():close]
+        pos = end
+
+
+def _script_type(attrs):
+    m = TYPE_ATTR.search(attrs)
+    return m.group(1).lower() if m else ''
+
+
+def _compact_json(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    # "</" would end the script element early; JSON allows "\/" for "/"
+    return json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+
+
+def _compact_css(body):
+    # A backslash-newline continues a CSS string, so leading space there is content
+    if '\\\n' in body: return body
+    return '\n'.join(line.strip() for line in body.splitlines() if line.strip())
+
+
+def _raw(tag, attrs, body, original):
+    kind = tag.lower()
+    if kind == 'script' and _script_type(attrs) in JSON_TYPES:
+        body = _compact_json(body)
+    elif kind == 'style':
+        body = _compact_css(body)
+    else:
+        return original
+    return f"<{tag}{attrs}>{body}</{tag}>"
+
+
+def minify(html):
+    out, text = [], []  # `text`: pending text, so "a <!-- x --> b" collapses to "a b"
+    pos = 0
+    for start, end, tag, attrs, body in blocks(html):
+        text.append(html[pos:start])
+        pos = end
+        if tag == '!--' and not body.startswith('[if'): continue
+        out.append(_collapse(''.join(text)))
+        text = []
+        out.append(html[start:end] if tag == '!--' else _raw(tag, attrs, body, html[start:end]))
+    text.append(html[pos:])
+    out.append(_collapse(''.join(text)))
+    return ''.join(out).strip()
+
+
+def scripts(html):
+    """
+    [(type, body)] of every <script>, JSON bodies parsed (for verify()).
+    """
+    found = []
+    for _, _, tag, attrs, body in blocks(html):
+        if tag.lower() != 'script': continue
+        kind = _script_type(attrs)
+        if kind in JSON_TYPES:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                pass
+        found.append((kind, body))
+    return found
+
+
+def verify(original, minified):
+    return scripts(original) == scripts(minified)
+
+
+def minify_page(html):
+    """
+    (html to write, ok). Falls back to the original when verify() fails.
+    """
+    small = minify(html)
+    if verify(html, small): return small, True
+    return html, False
@@ -0,0 +1,127 @@
+import http.client
+import ssl
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+import instrument
+
+# ==========================================
+# POOLED HTTP CLIENT (stdlib only)
+# ==========================================
+# urllib.request.urlopen() opens a new TCP + TLS connection for every file.
+# HttpPool keeps one keep-alive connection per (thread, host) and reuses it,
+# and throttles each host with a token bucket so a wide worker pool can't
+# hammer a single CDN. Safe to share between threads.
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class RateLimiter:
+    """
+    Token bucket: `rate` requests/second on average, bursts of up to `burst`.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpPool:
+    def __init__(self, headers=None, timeout=8, rate=None, burst=None, context=None, max_redirects=3):
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.rate = rate        # Per host; None = unlimited
+        self.burst = burst
+        self.context = context or ssl.create_default_context()
+        self.max_redirects = max_redirects
+        self.stats = {'requests': 0, 'connections': 0}
+        self._local = threading.local()
+        self._limiters = {}
+        self._all_conns = []
+        self._lock = threading.Lock()
+
+    def _limiter(self, host):
+        if not self.rate: return None
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.rate, self.burst)
+            return self._limiters[host]
+
+    def _conn(self, scheme, host, fresh=False):
+        conns = self._local.__dict__.setdefault('conns', {})
+        key = (scheme, host)
+        if fresh and key in conns:
+            conns.pop(key).close()
+        if key not in conns:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(host, timeout=self.timeout, context=self.context)
+            else:
+                conn = http.client.HTTPConnection(host, timeout=self.timeout)
+            conns[key] = conn
+            with self._lock:
+                self._all_conns.append(conn)
+                self.stats['connections'] += 1
+        return conns[key]
+
+    def _drop(self, scheme, host):
+        conn = self._local.__dict__.get('conns', {}).pop((scheme, host), None)
+        if conn: conn.close()
+
+    def get(self, url, headers=None):
+        """
+        GET `url` (following redirects). Returns (status, headers, body).
+        Raises OSError / http.client.HTTPException on network failure.
+        """
+        req_headers = dict(self.headers, **(headers or {}))
+        for _ in range(self.max_redirects + 1):
+            parts = urlsplit(url)
+            scheme, host = parts.scheme.lower(), parts.netloc
+            path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+            limiter = self._limiter(host)
+            if limiter: limiter.acquire()
+            with self._lock: self.stats['requests'] += 1
+
+            # A reused keep-alive socket may have been closed by the server: retry once on a new one
+            for attempt in (0, 1):
+                conn = self._conn(scheme, host, fresh=attempt == 1)
+                started = time.perf_counter()
+                try:
+                    conn.request('GET', path, headers=req_headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    instrument.record_http(time.perf_counter() - started, len(body))
+                    break
+                except (http.client.HTTPException, OSError):
+                    self._drop(scheme, host)
+                    if attempt == 1:
+                        instrument.record_http(time.perf_counter() - started, ok=False)
+                        raise
+            if resp.will_close: self._drop(scheme, host)
+
+            location = resp.getheader('Location')
+            if resp.status in REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                continue
+            return resp.status, resp.headers, body
+        raise http.client.HTTPException(f"Too many redirects: {url}")
+
+    def close(self):
+        with self._lock:
+            conns, self._all_conns = self._all_conns, []
+        for conn in conns:
+            conn.close()
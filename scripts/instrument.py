@@ -0,0 +1,263 @@
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows: no ru_maxrss
+    resource = None
+
+# ==========================================
+# PIPELINE INSTRUMENTATION
+# ==========================================
+# One lap timer per pipeline script. A script calls start('<name>'), then
+# mark('<stage>') at the top of each step. Each stage records:
+#   - wall time, CPU time (this process + reaped worker processes);
+#   - memory: the process's max RSS so far, and with PIPELINE_TRACEMALLOC=1
+#     the stage's peak traced Python memory (tracemalloc slows rendering
+#     ~5x, so it is opt-in);
+#   - HTTP requests: count, errors, bytes, latency p50 / p95 / max;
+#   - counters such as pages rendered and bytes written.
+# Shared code (feed_client, HttpPool, requests sessions via requests_hook)
+# reports HTTP on its own; every call is a no-op when no run is active.
+#
+# finish() (or exit) merges the run into build_report.json, next to
+# build_log.txt: one entry per script, so a cron pipeline shows every step.
+# PIPELINE_PROFILE=1 also profiles each stage with cProfile and dumps the
+# slowest one to assets/data/cache/profile/<script>.<stage>.prof (main
+# thread only: work inside thread pools shows up as waiting).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(ROOT, 'build_report.json')
+PROFILE_DIR = os.path.join(ROOT, 'assets', 'data', 'cache', 'profile')
+TRACE_MEMORY = os.environ.get('PIPELINE_TRACEMALLOC', '') == '1'
+PROFILE = os.environ.get('PIPELINE_PROFILE', '') == '1'
+
+_run = None
+_lock = threading.Lock()
+
+
+def _child_cpu():
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def _max_rss_mb(who):
+    if resource is None: return None
+    kb = resource.getrusage(who).ru_maxrss
+    return round(kb / (1048576 if sys.platform == 'darwin' else 1024), 1)  # bytes on macOS
+
+
+def _percentile(values, p):
+    if not values: return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        self.latencies = []
+        self.http_errors = 0
+        self.http_bytes = 0
+        self.profiler = None
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._child_cpu = _child_cpu()
+        self.result = None
+
+    def close(self):
+        self.result = {
+            'name': self.name,
+            'wall_s': round(time.perf_counter() - self._wall, 3),
+            'cpu_s': round(time.process_time() - self._cpu, 3),
+            'child_cpu_s': round(_child_cpu() - self._child_cpu, 3),
+            'peak_mem_mb': round(tracemalloc.get_traced_memory()[1] / 1048576, 1) if tracemalloc.is_tracing() else None,
+            'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+            'counters': dict(sorted(self.counters.items())),
+            'http': http_summary(self.latencies, self.http_errors, self.http_bytes),
+        }
+        return self.result
+
+
+def http_summary(latencies, errors, nbytes):
+    if not latencies and not errors: return None
+    return {
+        'requests': len(latencies), 'errors': errors, 'bytes': nbytes,
+        'total_s': round(sum(latencies), 3),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 1) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 1) if latencies else None,
+        'max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+class Run:
+    def __init__(self, script, report_path=REPORT_PATH, trace_memory=TRACE_MEMORY, profile=PROFILE):
+        self.script = script
+        self.report_path = report_path
+        self.profile = profile
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.stages = []
+        self.current = None
+        self.hottest = None  # (wall_s, stage name, cProfile.Profile)
+        self.finished = False
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._child_cpu = _child_cpu()
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing: tracemalloc.start()
+
+    def mark(self, name):
+        self._close_stage()
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak'): tracemalloc.reset_peak()  # 3.9+
+        stage = Stage(name)
+        if self.profile:
+            stage.profiler = cProfile.Profile()
+            stage.profiler.enable()
+        self.current = stage
+
+    def _close_stage(self):
+        stage, self.current = self.current, None
+        if stage is None: return
+        if stage.profiler: stage.profiler.disable()
+        result = stage.close()
+        self.stages.append(stage)
+        if stage.profiler and (self.hottest is None or result['wall_s'] > self.hottest[0]):
+            self.hottest = (result['wall_s'], stage.name, stage.profiler)
+
+    def finish(self, status='ok'):
+        if self.finished: return None
+        self._close_stage()
+        self.finished = True
+        counters, latencies, errors, nbytes = {}, [], 0, 0
+        for s in self.stages:
+            for k, v in s.counters.items(): counters[k] = counters.get(k, 0) + v
+            latencies += s.latencies
+            errors += s.http_errors
+            nbytes += s.http_bytes
+        report = {
+            'started_at': self.started_at,
+            'status': status,
+            'wall_s': round(time.perf_counter() - self._wall, 3),
+            'cpu_s': round(time.process_time() - self._cpu, 3),
+            'child_cpu_s': round(_child_cpu() - self._child_cpu, 3),
+            'peak_mem_mb': max((s.result['peak_mem_mb'] or 0 for s in self.stages), default=None) if tracemalloc.is_tracing() else None,
+            'max_rss_mb': _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+            'children_max_rss_mb': _max_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            'counters': dict(sorted(counters.items())),
+            'http': http_summary(latencies, errors, nbytes),
+            'stages': [s.result for s in self.stages],
+            'profile': self._dump_profile(),
+        }
+        if self._started_tracing: tracemalloc.stop()
+        self._save(report)
+        self._print(report)
+        return report
+
+    def _dump_profile(self):
+        if not self.hottest: return None
+        _, name, profiler = self.hottest
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.script}.{name}.prof")
+        profiler.dump_stats(path)
+        return os.path.relpath(path, ROOT).replace(os.sep, '/')
+
+    def _save(self, report):
+        try:
+            with open(self.report_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        data[self.script] = report
+        tmp = f"{self.report_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.report_path)
+
+    def _print(self, report):
+        mem = f", peak {report['peak_mem_mb']} MB traced" if report['peak_mem_mb'] is not None else ""
+        if report['max_rss_mb'] is not None: mem += f", max RSS {report['max_rss_mb']} MB"
+        print(f"⏱️ {self.script}: {report['wall_s']:.1f} s wall, {report['cpu_s'] + report['child_cpu_s']:.1f} s CPU{mem}"
+              f" -> {os.path.basename(self.report_path)}")
+        for s in report['stages']:
+            share = s['wall_s'] / report['wall_s'] if report['wall_s'] else 0
+            extra = [f"{k} {_human(k, v)}" for k, v in s['counters'].items()]
+            if s['http']: extra.append(f"{s['http']['requests']} http (p95 {s['http']['p95_ms'] or 0} ms, {s['http']['errors']} errors)")
+            if s['peak_mem_mb'] is not None: extra.append(f"peak {s['peak_mem_mb']} MB")
+            elif s['max_rss_mb'] is not None: extra.append(f"rss {s['max_rss_mb']} MB")
+            print(f"   -> {s['name']}: {s['wall_s']:.2f} s ({share:.0%})" + (f" | {', '.join(extra)}" if extra else ""))
+        if report['profile']:
+            print(f"   🔬 Profile of the slowest stage: {report['profile']} (python -m pstats {report['profile']})")
+            pstats.Stats(os.path.join(ROOT, report['profile'])).sort_stats('cumulative').print_stats(12)
+
+
+def _human(key, value):
+    return f"{value / 1048576:.1f} MB" if key.startswith('bytes') else str(value)
+
+
+# ==========================================
+# MODULE API (no-ops without an active run)
+# ==========================================
+def start(script, **kwargs):
+    """
+    Starts timing `script`. The report is written by finish(), or at exit if the script returns early.
+    """
+    global _run
+    _run = Run(script, **kwargs)
+    atexit.register(_finish_at_exit, _run)
+    return _run
+
+
+def mark(stage):
+    if _run and not _run.finished: _run.mark(stage)
+
+
+def finish(status='ok'):
+    return _run.finish(status) if _run else None
+
+
+def _finish_at_exit(run):
+    if not run.finished: run.finish('incomplete')
+
+
+def add(key, n=1):
+    """
+    Adds `n` to counter `key` (e.g. 'pages', 'bytes_written') of the current stage.
+    """
+    stage = _run.current if _run else None
+    if stage is None: return
+    with _lock:
+        stage.counters[key] = stage.counters.get(key, 0) + n
+
+
+def record_http(seconds, nbytes=0, ok=True):
+    """
+    One HTTP request: latency in seconds and response body size. Thread-safe.
+    """
+    stage = _run.current if _run else None
+    if stage is None: return
+    with _lock:
+        if ok:
+            stage.latencies.append(seconds)
+            stage.http_bytes += nbytes
+        else:
+            stage.http_errors += 1
+
+
+def requests_hook(response, *args, **kwargs):
+    """
+    requests 'response' hook: session.hooks['response'].append(instrument.requests_hook).
+    """
+    record_http(response.elapsed.total_seconds(), int(response.headers.get('Content-Length') or 0))
+
+
+def in_worker():
+    # Forked worker processes inherit tracing; they only render, so drop its overhead
+    if tracemalloc.is_tracing(): tracemalloc.stop()
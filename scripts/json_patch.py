@@ -0,0 +1,139 @@
+import copy
+
+# ==========================================
+# JSON PATCH (RFC 6902) / MERGE PATCH (RFC 7396)
+# ==========================================
+# Used by the CMS server's /api/config/patch, so the admin can send the
+# few values it changed instead of the whole config. apply_patch() works
+# on a deep copy: a failing operation (bad path, failed "test") leaves the
+# document untouched.
+
+
+class PatchError(ValueError):
+    pass
+
+
+def parse_pointer(pointer):
+    """
+    RFC 6901 pointer -> list of reference tokens ("" is the whole document).
+    """
+    if pointer == '': return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [t.replace('~1', '/').replace('~0', '~') for t in pointer[1:].split('/')]
+
+
+def _index(container, token, pointer, append=False):
+    if token == '-' and append: return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise PatchError(f"Invalid array index {token!r} in {pointer}")
+    i = int(token)
+    if i > len(container) or (i == len(container) and not append):
+        raise PatchError(f"Array index out of range in {pointer}")
+    return i
+
+
+def _parent(doc, pointer):
+    tokens = parse_pointer(pointer)
+    if not tokens: return None, None
+    target = doc
+    for token in tokens[:-1]:
+        if isinstance(target, dict) and token in target:
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_index(target, token, pointer)]
+        else:
+            raise PatchError(f"Path not found: {pointer}")
+    return target, tokens[-1]
+
+
+def get(doc, pointer):
+    parent, token = _parent(doc, pointer)
+    if parent is None: return doc
+    if isinstance(parent, dict):
+        if token not in parent: raise PatchError(f"Path not found: {pointer}")
+        return parent[token]
+    if isinstance(parent, list): return parent[_index(parent, token, pointer)]
+    raise PatchError(f"Path not found: {pointer}")
+
+
+def json_equal(a, b):
+    """
+    RFC 6902 "test" equality: same JSON type and value, so true != 1 and 1 != 1.0.
+    """
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(json_equal(x, y) for x, y in zip(a, b))
+    return type(a) is type(b) and a == b
+
+
+def _add(doc, pointer, value):
+    parent, token = _parent(doc, pointer)
+    if parent is None: return value
+    if isinstance(parent, dict): parent[token] = value
+    elif isinstance(parent, list): parent.insert(_index(parent, token, pointer, append=True), value)
+    else: raise PatchError(f"Path not found: {pointer}")
+    return doc
+
+
+def _remove(doc, pointer):
+    parent, token = _parent(doc, pointer)
+    if parent is None: raise PatchError("Cannot remove the whole document")
+    if isinstance(parent, dict):
+        if token not in parent: raise PatchError(f"Path not found: {pointer}")
+        return parent.pop(token)
+    if isinstance(parent, list): return parent.pop(_index(parent, token, pointer))
+    raise PatchError(f"Path not found: {pointer}")
+
+
+def apply_patch(doc, operations):
+    """
+    Applies RFC 6902 `operations` to a copy of `doc`. Returns the new document.
+    """
+    if not isinstance(operations, list): raise PatchError("A JSON Patch is a list of operations")
+    doc = copy.deepcopy(doc)
+    for op in operations:
+        if not isinstance(op, dict) or 'path' not in op: raise PatchError(f"Invalid operation: {op!r}")
+        kind, path = op.get('op'), op['path']
+        if kind in ('add', 'replace', 'test') and 'value' not in op:
+            raise PatchError(f"'{kind}' needs a value: {path}")
+        if kind == 'add':
+            doc = _add(doc, path, copy.deepcopy(op['value']))
+        elif kind == 'remove':
+            _remove(doc, path)
+        elif kind == 'replace':
+            get(doc, path)  # Must exist
+            if path == '': doc = copy.deepcopy(op['value'])
+            else:
+                _remove(doc, path)
+                doc = _add(doc, path, copy.deepcopy(op['value']))
+        elif kind in ('move', 'copy'):
+            source = op.get('from')
+            if kind == 'move' and path.startswith(f"{source}/"): raise PatchError(f"Cannot move {source} into itself")
+            value = _remove(doc, source) if kind == 'move' else copy.deepcopy(get(doc, source))
+            doc = _add(doc, path, value)
+        elif kind == 'test':
+            if not json_equal(get(doc, path), op['value']): raise PatchError(f"Test failed: {path}")
+        else:
+            raise PatchError(f"Unknown operation: {kind!r}")
+    return doc
+
+
+def merge_patch(doc, patch):
+    """
+    RFC 7396: objects merge recursively, null deletes a key, anything else replaces.
+    """
+    if not isinstance(patch, dict): return copy.deepcopy(patch)
+    out = dict(doc) if isinstance(doc, dict) else {}
+    for key, value in patch.items():
+        if value is None: out.pop(key, None)
+        else: out[key] = merge_patch(out.get(key), value)
+    return out
+
+
+def changed_sections(old, new):
+    """
+    Top-level keys whose value differs between two configs.
+    """
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
@@ -0,0 +1,216 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+# ==========================================
+# CONTENT-ADDRESSED LOGO STORE
+# ==========================================
+# Logos are stored ONCE per distinct image under assets/logos/store/<hash>.webp.
+# assets/logos/index.json maps logical keys ("tsdb/<slug>", "streamed/<slug>",
+# "leagues/<slug>") to a hash + when it was last fetched. The same club under
+# five name variants (or a placeholder badge used by hundreds of teams) is
+# one file in git and one cached file in the browser.
+#
+# Not yet compacted trees still have the old per-slug files
+# (assets/logos/<kind>/<slug>.webp); lookups fall back to them, and
+# `python scripts/logo_store.py compact` copies them into the store. It is a
+# manual migration, not a scheduled step: committed pages have logo URLs
+# baked into their inline maps, so a file is only deleted (--delete-legacy,
+# unreferenced store files) once no built page or published map points at
+# it, i.e. after a full rebuild.
+LOGOS_DIR = 'assets/logos'
+STORE_DIR = 'assets/logos/store'
+INDEX_PATH = 'assets/logos/index.json'
+KINDS = ('tsdb', 'streamed', 'leagues')
+INDEX_VERSION = 1
+MANIFEST_PATH = 'assets/data/build_manifest.json'  # scripts/build_manifest.py
+MAPS_DIR = 'assets/data/maps'  # scripts/map_assets.py
+LOGO_REF_RE = re.compile(r'/assets/logos/[\w./-]+?\.webp')
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+class LogoStore:
+    def __init__(self, root='.'):
+        self.root = root
+        self.store_dir = os.path.join(root, STORE_DIR)
+        self.index_path = os.path.join(root, INDEX_PATH)
+        self.entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path): return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = data.get('logos', {})
+        except (json.JSONDecodeError, OSError):
+            print(f"⚠️ Warning: {self.index_path} unreadable. Starting an empty logo index.")
+
+    def _legacy_path(self, key):
+        return os.path.join(self.root, LOGOS_DIR, f"{key}.webp")
+
+    def file_path(self, key):
+        """
+        On-disk file for `key` (store file, else the legacy per-slug file), or None.
+        """
+        entry = self.entries.get(key)
+        if entry: return os.path.join(self.store_dir, f"{entry['hash']}.webp")
+        legacy = self._legacy_path(key)
+        return legacy if os.path.exists(legacy) else None
+
+    def url(self, key):
+        entry = self.entries.get(key)
+        if entry: return f"/{STORE_DIR}/{entry['hash']}.webp"
+        if os.path.exists(self._legacy_path(key)): return f"/{LOGOS_DIR}/{key}.webp"
+        return None
+
+    def has(self, key):
+        return self.file_path(key) is not None
+
+    def age_days(self, key):
+        entry = self.entries.get(key)
+        if entry: return (time.time() - entry.get('updated', 0)) / (24 * 3600)
+        legacy = self._legacy_path(key)
+        if os.path.exists(legacy): return (time.time() - os.path.getmtime(legacy)) / (24 * 3600)
+        return None
+
+    def should_download(self, key, max_age_days):
+        age = self.age_days(key)
+        return age is None or age > max_age_days
+
+    def put(self, key, data, updated=None):
+        """
+        Stores `data` under its content hash and points `key` at it. Thread-safe.
+        """
+        digest = content_hash(data)
+        path = os.path.join(self.store_dir, f"{digest}.webp")
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(self.store_dir, exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            self.entries[key] = {'hash': digest, 'updated': int(updated if updated is not None else time.time())}
+            self._dirty = True
+        return digest
+
+    def slugs(self, kind):
+        """
+        {slug: url} for every logo of `kind` (index first, then legacy files).
+        """
+        out = {}
+        prefix = f"{kind}/"
+        for key in self.entries:
+            if key.startswith(prefix): out[key[len(prefix):]] = self.url(key)
+        legacy_dir = os.path.join(self.root, LOGOS_DIR, kind)
+        if os.path.isdir(legacy_dir):
+            for f in os.listdir(legacy_dir):
+                if f.endswith('.webp') and f[:-5] not in out:
+                    out[f[:-5]] = f"/{LOGOS_DIR}/{kind}/{f}"
+        return out
+
+    def save(self):
+        if not self._dirty: return
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp = f"{self.index_path}.tmp"
+        # One line per logo keeps git diffs to the entries that changed
+        lines = [f"  {json.dumps(k)}: {json.dumps(v, sort_keys=True)}" for k, v in sorted(self.entries.items())]
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(f'{{\n "version": {INDEX_VERSION},\n "logos": {{\n' + ',\n'.join(lines) + '\n }\n}\n')
+        os.replace(tmp, self.index_path)
+        self._dirty = False
+
+    # --- COMPACTION ---
+    def referenced_urls(self):
+        """
+        Logo URLs that built pages (build manifest) or published maps still point at.
+        """
+        try:
+            with open(os.path.join(self.root, MANIFEST_PATH), 'r', encoding='utf-8') as f:
+                pages = [os.path.join(self.root, key) for key in json.load(f).get('pages', {})]
+        except (OSError, json.JSONDecodeError):
+            pages = []
+        urls = set()
+        for path in pages + glob.glob(os.path.join(self.root, MAPS_DIR, '*.json')):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    urls.update(LOGO_REF_RE.findall(f.read()))
+            except OSError:
+                continue
+        return urls
+
+    def compact(self, image_map_path=None, delete_legacy=False):
+        """
+        Copies legacy per-slug files into the store and rewrites image_map.json
+        URLs to match. Legacy files (with `delete_legacy`) and store files
+        nothing points at are deleted only if no built page references them.
+        """
+        moved = {}
+        before = after = migrated = 0
+        in_use = self.referenced_urls()
+        kept = []
+        for kind in KINDS:
+            legacy_dir = os.path.join(self.root, LOGOS_DIR, kind)
+            if not os.path.isdir(legacy_dir): continue
+            for f in sorted(os.listdir(legacy_dir)):
+                if not f.endswith('.webp'): continue
+                path = os.path.join(legacy_dir, f)
+                with open(path, 'rb') as fh: data = fh.read()
+                before += len(data)
+                key = f"{kind}/{f[:-5]}"
+                # An entry already in the index was fetched after the legacy file
+                if key not in self.entries:
+                    self.put(key, data, updated=os.path.getmtime(path))
+                    migrated += 1
+                legacy_url = f"/{LOGOS_DIR}/{key}.webp"
+                moved[legacy_url] = self.url(key)
+                if not delete_legacy: continue
+                if legacy_url in in_use: kept.append(legacy_url)
+                else: os.remove(path)
+            if not os.listdir(legacy_dir): os.rmdir(legacy_dir)
+
+        # Garbage-collect store files neither the index nor a page points at
+        live = {e['hash'] for e in self.entries.values()}
+        removed = 0
+        if os.path.isdir(self.store_dir):
+            for f in os.listdir(self.store_dir):
+                if not f.endswith('.webp'): continue
+                if f[:-5] not in live and f"/{STORE_DIR}/{f}" not in in_use:
+                    os.remove(os.path.join(self.store_dir, f))
+                    removed += 1
+                else:
+                    after += os.path.getsize(os.path.join(self.store_dir, f))
+        self.save()
+
+        if image_map_path and moved and os.path.exists(image_map_path):
+            with open(image_map_path, 'r', encoding='utf-8') as f:
+                image_map = json.load(f)
+            for section in image_map.values():
+                for name, url in section.items():
+                    section[name] = moved.get(url, url)
+            with open(image_map_path, 'w') as f:
+                json.dump(image_map, f, indent=2)
+
+        print(f"🗜️ Logos: {migrated} files migrated, {len(live)} unique images, {removed} orphans removed")
+        if before: print(f"   {before / 1048576:.1f} MB of legacy files, store now {after / 1048576:.1f} MB")
+        if kept:
+            print(f"⚠️ {len(kept)} legacy files kept: built pages still reference them. "
+                  "Rebuild every page (python scripts/build_site.py --force), then run this again.")
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in (['compact'], ['compact', '--delete-legacy']):
+        print("Usage: python scripts/logo_store.py compact [--delete-legacy]")
+        sys.exit(1)
+    LogoStore().compact(image_map_path='assets/data/image_map.json', delete_legacy='--delete-legacy' in sys.argv)
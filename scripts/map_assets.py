@@ -0,0 +1,147 @@
+import glob
+import hashlib
+import json
+import os
+import re
+
+# ==========================================
+# EXTERNAL (CACHEABLE) IMAGE MAP
+# ==========================================
+# Instead of inlining the ~600 KB image map into every page, publish it as
+# content-hashed static JSON. The filename changes only when the content
+# does, so browsers/CDN can cache it forever. Pages get a tiny
+# IMAGE_MAP_SRC pointer instead:
+#   external: {"teams": "/…/image_map.teams.<hash>.json", "leagues": "…"}
+#   sharded:  {"teams": {"a": "/…/image_map.teams-a.<hash>.json", …}, "leagues": "…"}
+#
+# Publishing never deletes older versions: committed pages that are not
+# rebuilt in the same run (league / custom pages on an asset update or a
+# matches-only deploy) still point at them. build_site.py removes a version
+# once no page in the build manifest references it (collect_garbage()).
+MAPS_DIR = 'assets/data/maps'
+MAPS_URL = '/assets/data/maps'
+MODES = ('external', 'sharded', 'inline')
+MAP_REF_RE = re.compile(r'/assets/data/maps/((?:image_map\.[\w-]+|league_map)\.[0-9a-f]{10}\.json)')
+
+
+def slugify(text):
+    """
+    Same as slugify() in the templates: the key format league_map.json uses.
+    """
+    text = re.sub(r'[^A-Za-z0-9_\s-]', '', str(text or '').lower())
+    return re.sub(r'\s+', '-', text).strip('-')
+
+
+def shard_key(name):
+    """
+    Shard for a team display name. Must match imageMapShard() in the templates.
+    """
+    c = str(name or '')[:1].lower()[:1]
+    return c if c.isascii() and c.isalnum() else '_'
+
+
+def _write_versioned(data, stem, out_dir, url_base):
+    blob = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha1(blob).hexdigest()[:10]
+    name = f"{stem}.{digest}.json"
+    path = os.path.join(out_dir, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(blob)
+    return f"{url_base}/{name}"
+
+
+def publish_image_map(image_map, mode='external', out_dir=MAPS_DIR, url_base=MAPS_URL):
+    """
+    Writes the versioned map file(s). Returns the IMAGE_MAP_SRC dict pages should embed (None for 'inline').
+    """
+    if mode == 'inline': return None
+    os.makedirs(out_dir, exist_ok=True)
+    teams = image_map.get('teams', {})
+    src = {'leagues': _write_versioned(image_map.get('leagues', {}), 'image_map.leagues', out_dir, url_base)}
+
+    if mode == 'sharded':
+        shards = {}
+        for name, path in teams.items():
+            shards.setdefault(shard_key(name), {})[name] = path
+        src['teams'] = {k: _write_versioned(shards[k], f"image_map.teams-{k}", out_dir, url_base)
+                        for k in sorted(shards)}
+    else:
+        src['teams'] = _write_versioned(teams, 'image_map.teams', out_dir, url_base)
+    return src
+
+
+def publish_league_map(reverse_map, out_dir=MAPS_DIR, url_base=MAPS_URL):
+    """
+    Versioned copy of the team -> league map, the fallback for pruned league pages.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    return _write_versioned(reverse_map, 'league_map', out_dir, url_base)
+
+
+def referenced(pages, extra=()):
+    """
+    Map file names that `pages` (output paths) or the `extra` strings point at.
+    """
+    names = set()
+    for text in extra:
+        names.update(MAP_REF_RE.findall(text or ''))
+    for path in pages:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                names.update(MAP_REF_RE.findall(f.read()))
+        except OSError:
+            continue
+    return names
+
+
+def collect_garbage(used, out_dir=MAPS_DIR):
+    """
+    Deletes versioned maps whose name is not in `used`. Returns their names.
+    """
+    removed = []
+    for path in glob.glob(os.path.join(out_dir, '*_map.*.json')):
+        if os.path.basename(path) not in used:
+            os.remove(path)
+            removed.append(os.path.basename(path))
+    return removed
+
+
+# ==========================================
+# PER-PAGE PRUNED MAPS
+# ==========================================
+# A league page (e.g. /nba-streams/) only lists matches for one league, so
+# it gets only that league's teams inline. Names outside the subset are
+# resolved from the shared files above by the page itself.
+def league_scope(league_map, page_filter):
+    """
+    league_map.json leagues a page filtering on `page_filter` can show
+    (same exact / containment test as the league template).
+    """
+    f = (page_filter or '').strip().lower()
+    return [k for k in league_map if k.lower() == f or (len(f) > 2 and f in k.lower())]
+
+
+def prune_maps(image_map, reverse_map, team_index, leagues, page_filter):
+    """
+    Returns (image_map subset, team -> league subset) for `leagues`.
+    `team_index` maps slugify(team name) -> image_map team names.
+    """
+    leagues = set(leagues)
+    team_map = {slug: lg for slug, lg in reverse_map.items() if lg in leagues}
+    all_teams = image_map.get('teams', {})
+    teams = {name: all_teams[name] for slug in team_map for name in team_index.get(slug, ())}
+
+    # League logo: exact key, else the first loosely equal key (the template's lookup order)
+    all_leagues = image_map.get('leagues', {})
+    loose = lambda s: re.sub(r'[^a-z0-9]', '', (s or '').lower())
+    logos = {}
+    if all_leagues.get(page_filter):
+        logos[page_filter] = all_leagues[page_filter]
+    else:
+        target = loose(page_filter)
+        for key, url in all_leagues.items():
+            if loose(key) == target:
+                logos[key] = url
+                break
+    return {'teams': teams, 'leagues': logos}, team_map
@@ -0,0 +1,282 @@
+import html
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+from map_assets import slugify
+
+# ==========================================
+# BUILD-TIME MATCH SNAPSHOT
+# ==========================================
+# The pages used to fetch the whole feed from the API on every view and run
+# resolveLeagueData / getCleanTeamName / calculateScore over ~630 matches
+# in the browser. build_engine.py now does that once per deploy and writes
+# assets/data/matches.json: matches already resolved, cleaned, scored and
+# sorted. Pages render straight from it and only ask the API when it is
+# older than site_settings.live_refresh_seconds.
+#
+# These functions mirror the master template's JS line for line; if one
+# changes, change the other.
+SNAPSHOT_PATH = 'assets/data/matches.json'
+SNAPSHOT_URL = '/assets/data/matches.json'
+LIVE_REFRESH_SECONDS = 900  # Deploys run every 10 min
+WATCH_DIR = 'watch'  # Static per-match pages: watch/<match-id>/index.html
+
+# Fields the templates read from a match (the rest of the feed is dropped)
+KEEP_FIELDS = ('id', 'home_team', 'away_team', 'league', 'sport', 'is_live', 'live_viewers',
+               'status_text', 'timestamp', 'startTimeUnix', 'stream_channels', 'sport_duration')
+
+NAME_FIXES = {
+    "icehockey": "Ice Hockey", "fieldhockey": "Field Hockey",
+    "tabletennis": "Table Tennis", "americanfootball": "American Football",
+    "australianfootball": "AFL", "basketball": "Basketball",
+    "football": "Football", "soccer": "Soccer", "baseball": "Baseball",
+    "fighting": "Fighting", "mma": "MMA", "boxing": "Boxing",
+    "motorsport": "Motorsport", "golf": "Golf"
+}
+US_PREFIX = re.compile(r'^(NHL|NBA|NFL|MLB|UFC):\s*', re.IGNORECASE)
+
+
+def unslugify(slug):
+    return ' '.join(w[:1].upper() + w[1:] for w in slug.split('-'))
+
+
+def escape_html(text):
+    if not text: return text
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('"', '&quot;').replace("'", '&#039;'))
+
+
+def start_time_ms(m):
+    """
+    startTimeUnix (ms), derived from `timestamp` when the feed omits it.
+    """
+    if m.get('startTimeUnix'): return m['startTimeUnix']
+    ts = m.get('timestamp')
+    if isinstance(ts, (int, float)): return ts
+    if not ts: return None
+    try:
+        return int(datetime.fromisoformat(str(ts).replace('Z', '+00:00')).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def match_page_slug(match_id):
+    """
+    Output slug of a match's static watch page ("watch/<id>"), or None for unusable IDs.
+    """
+    key = re.sub(r'[^a-z0-9-]+', '-', str(match_id or '').lower()).strip('-')
+    return f"{WATCH_DIR}/{key}" if key else None
+
+
+def resolve_league(m, team_to_league, home_fallback=True):
+    h_raw = m.get('home_team') or ""
+    h_slug = slugify(h_raw)
+    a_slug = slugify(m.get('away_team'))
+
+    # 1. Strict Map Check (Both Teams must match the league)
+    home_league = team_to_league.get(h_slug)
+    if home_league and team_to_league.get(a_slug) == home_league:
+        return home_league
+    # 2. Map Fallback (Home Team only; the watch page never does this)
+    if home_league and home_fallback:
+        return home_league
+    # 3. Prefix Rule ("NFL: Patriots" -> "NFL")
+    if ':' in h_raw:
+        candidate = h_raw.split(':')[0].strip()
+        if 1 < len(candidate) < 25:
+            return candidate
+    # 4. API Fallback with Name Correction
+    api_name = (m.get('league') or m.get('sport') or "Other").strip()
+    return NAME_FIXES.get(re.sub(r'\s', '', api_name.lower()), api_name)
+
+
+def clean_team_name(raw, slug, league, team_to_league):
+    if not raw or raw == "TBA" or slug == "tba": return "TBA"
+    if team_to_league.get(slug): return unslugify(slug)
+    clean = raw
+    if league:
+        clean = re.sub(f"^{re.escape(league)}:\\s*", '', clean, count=1, flags=re.IGNORECASE)
+    return US_PREFIX.sub('', clean, count=1).strip()
+
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def base_score(m, league, priorities):
+    """
+    calculateScore() without the time-proximity term, which depends on
+    when the page is viewed and is added by the page.
+    """
+    score = 0
+    boost_list = [s.strip() for s in str(priorities.get('_BOOST') or '').lower().split(',') if s.strip()]
+    league_low = (league or '').lower()
+    sport_low = (m.get('sport') or '').lower()
+    if any(k in league_low or k in sport_low for k in boost_list):
+        score += 2000
+
+    sport_key = m.get('sport') or "General"
+    if isinstance(priorities.get(league), dict):
+        score += _num(priorities[league].get('score')) * 10
+    elif isinstance(priorities.get(sport_key), dict):
+        score += _num(priorities[sport_key].get('score'))
+
+    if m.get('is_live'):
+        score += 5000 + _num(m.get('live_viewers'))
+    return score
+
+
+def time_score(m, now_ms):
+    # Closer kick-off = higher (same as the template's timeScore())
+    if m.get('is_live') or m.get('startTimeUnix') is None: return 0
+    hours_until = (m['startTimeUnix'] - now_ms) / 3600000
+    return 24 - hours_until if hours_until < 24 else 0
+
+
+def build_snapshot(matches, team_to_league, priorities, now=None):
+    """
+    {'generated_at': ms, 'matches': [...]}: valid matches with finalLeague,
+    displayHome/displayAway and baseScore, sorted best first as of `now`.
+    """
+    now_ms = int((now if now is not None else time.time()) * 1000)
+    out = []
+    for raw in matches:
+        home, away = raw.get('home_team'), raw.get('away_team')
+        if (home == 'TBA' or not home) and (away == 'TBA' or not away): continue
+        m = {k: raw[k] for k in KEEP_FIELDS if raw.get(k) is not None}
+        start = start_time_ms(raw)
+        if start is not None: m['startTimeUnix'] = start
+
+        league = resolve_league(m, team_to_league)
+        m['finalLeague'] = league
+        m['displayHome'] = escape_html(clean_team_name(home, slugify(home), league, team_to_league))
+        m['displayAway'] = escape_html(clean_team_name(away, slugify(away), league, team_to_league))
+        m['baseScore'] = base_score(m, league, priorities)
+        page = match_page_slug(m.get('id'))
+        if page: m['page'] = f"/{page}/"
+        out.append(m)
+
+    out.sort(key=lambda m: m['baseScore'] + time_score(m, now_ms), reverse=True)
+    return {'generated_at': now_ms, 'matches': out}
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_PATH, checked=True):
+    """
+    Writes the snapshot. Returns True if its matches changed.
+    Unchanged matches are still rewritten with the new generated_at when
+    `checked` (the feed was just read), since pages judge freshness by it;
+    pass checked=False for data served from a stale copy.
+    """
+    body = json.dumps(snapshot['matches'], separators=(',', ':'))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            changed = json.dumps(json.load(f).get('matches'), separators=(',', ':')) != body
+    except (OSError, json.JSONDecodeError, AttributeError):
+        changed = True
+    if not changed and not checked: return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    os.replace(tmp, path)
+    return changed
+
+
+def live_refresh_seconds(settings):
+    """
+    site_settings.live_refresh_seconds: how old a snapshot may get before pages also ask the API (0 = never).
+    """
+    try:
+        return max(0, int(settings.get('live_refresh_seconds', LIVE_REFRESH_SECONDS)))
+    except (TypeError, ValueError):
+        return LIVE_REFRESH_SECONDS
+
+
+def feed_url(api_url, country):
+    # Same request the pages make: "<api_url>?country=<cc>" unless the URL already has a query
+    return api_url if '?' in api_url else f"{api_url}?country={country.lower()}"
+
+
+# ==========================================
+# STATIC WATCH PAGES (mirrors watch_template.html)
+# ==========================================
+SINGLE_EVENT_AWAY = {"tba", "null", "nill", "undefined", ""}
+
+
+def format_time(value, country):
+    """
+    formatTime(): ("7:30 PM ET", "Oct 17") in the site's timezone.
+    """
+    ms = start_time_ms({'timestamp': value})
+    if ms is None: return "--:--", "--"
+    is_uk = country == 'UK'
+    tz = ZoneInfo('Europe/London' if is_uk else 'America/New_York') if ZoneInfo else timezone.utc
+    d = datetime.fromtimestamp(ms / 1000, tz)
+    clock = f"{d.hour % 12 or 12}:{d.minute:02d} {'AM' if d.hour < 12 else 'PM'}"
+    return clock + (' GMT' if is_uk else ' ET'), f"{d.strftime('%b')} {d.day}"
+
+
+def apply_shortcodes(template, m, site_name):
+    if not template: return ""
+    out = template
+    if m['isSingleEvent']:
+        out = re.sub(r'\s*vs\s*{{AWAY}}', '', out, flags=re.IGNORECASE).replace('{{AWAY}}', '')
+    else:
+        out = out.replace('{{AWAY}}', m['away'])
+    for key, value in (('{{HOME}}', m['home']), ('{{LEAGUE}}', m['league']), ('{{SPORT}}', m['sport']),
+                       ('{{TIME}}', m['timeOnly']), ('{{DATE}}', m['dateOnly']), ('{{SITE_NAME}}', site_name),
+                       ('{{VS}}', m['home'] if m['isSingleEvent'] else f"{m['home']} vs {m['away']}")):
+        out = out.replace(key, value)
+    return out
+
+
+def watch_page_data(m, team_to_league, watch_settings, site_name, domain, country):
+    """
+    page_data for a match's static watch page: the SEO text the page's JS
+    would set, computed from the match fields that don't change minute to
+    minute (live status, timers and channels are read at view time).
+    """
+    slug = match_page_slug(m.get('id'))
+    home, away = m.get('home_team'), m.get('away_team')
+    league = resolve_league(m, team_to_league, home_fallback=False)
+    sport_raw = (m.get('sport') or "General").strip()
+    clean_away = clean_team_name(away, slugify(away), league, team_to_league)
+    time_only, date_only = format_time(m.get('timestamp') or m.get('startTimeUnix'), country)
+    seo = {
+        'home': clean_team_name(home, slugify(home), league, team_to_league),
+        'away': clean_away,
+        'league': league,
+        'sport': NAME_FIXES.get(re.sub(r'\s', '', sport_raw.lower()), sport_raw),
+        'timeOnly': time_only,
+        'dateOnly': date_only,
+        'isSingleEvent': (clean_away or '').lower().strip() in SINGLE_EVENT_AWAY,
+    }
+    title = apply_shortcodes(watch_settings.get('meta_title', 'Watch {{HOME}} vs {{AWAY}} Live'), seo, site_name)
+    return {
+        'slug': slug,
+        'layout': 'watch',
+        'title': title,
+        'meta_title': html.escape(title),
+        'meta_desc': html.escape(apply_shortcodes(watch_settings.get('meta_desc', 'Watch {{HOME}} vs {{AWAY}} live stream online.'), seo, site_name)),
+        'canonical_url': f"https://{domain}/{slug}/",
+        'match_id': m.get('id'),
+    }
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
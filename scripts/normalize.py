@@ -0,0 +1,72 @@
+import re
+from functools import lru_cache
+
+# ==========================================
+# SHARED TEAM-NAME NORMALISATION
+# ==========================================
+# One copy of clean_display_name() for build_engine.py, fetch_streamed.py
+# and generate_map.py. The league whitelist is compiled once into a prefix
+# trie, so a name is scanned once (O(len(name))) and the LONGEST matching
+# league wins ("A League Men - X" -> "X", never "Men - X"). The old
+# per-script loops walked a set, so which prefix won depended on set order.
+ALLOWED_LEAGUES_INPUT = """
+NFL, NBA, MLB, NHL, College Football, College-Football, College Basketball, College-Basketball,
+NCAAB, NCAAF, NCAA Men, NCAA-Men, NCAA Women, NCAA-Women, Premier League, Premier-League,
+Champions League, Champions-League, MLS, Bundesliga, Serie-A, Serie A, American-Football, American Football,
+Ice Hockey, Ice-Hockey, Championship, Scottish Premiership, Scottish-Premiership,
+Europa League, Europa-League, A League, A-League, A League Men, A League Women,
+Ligue 1, La Liga, Eredivisie, Primeira Liga, Saudi Pro League, F1, UFC, Rugby
+"""
+VALID_LEAGUES = {x.strip().lower() for x in ALLOWED_LEAGUES_INPUT.split(',') if x.strip()}
+LEADING_SEPARATORS = re.compile(r"^[\s-]+")
+_END = ''  # Trie key marking "a league ends here"
+
+
+def _build_trie(prefixes):
+    root = {}
+    for p in prefixes:
+        node = root
+        for ch in p:
+            node = node.setdefault(ch, {})
+        node[_END] = True
+    return root
+
+
+_TRIE = _build_trie(VALID_LEAGUES)
+
+
+def league_prefix_lengths(lower_name):
+    """
+    Lengths of every whitelisted league `lower_name` starts with, longest first.
+    """
+    found = []
+    node = _TRIE
+    for i, ch in enumerate(lower_name):
+        node = node.get(ch)
+        if node is None: break
+        if _END in node: found.append(i + 1)
+    return found[::-1]
+
+
+@lru_cache(maxsize=8192)
+def clean_display_name(name):
+    """
+    Sanitizer:
+    1. PRIORITY RULE: If a colon (:) is found, assume format "League: Team"
+       and strip everything before the first colon.
+    2. FALLBACK: Strip the longest whitelisted league prefix (e.g. "NBA - Team").
+    """
+    if not name: return None
+
+    # --- RULE 1: Generic Colon Stripper ---
+    if ':' in name:
+        cleaned = name.split(':', 1)[1].strip()
+        if cleaned and len(cleaned) > 1:
+            return cleaned
+
+    # --- RULE 2: Whitelist Fallback (longest prefix that leaves a real name) ---
+    for n in league_prefix_lengths(name.lower()):
+        clean_remainder = LEADING_SEPARATORS.sub("", name[n:])
+        if clean_remainder and len(clean_remainder.strip()) > 1:
+            return clean_remainder.strip()
+    return name.strip()
@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+from build_manifest import pending_outputs
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings without it
+    brotli = None
+
+# ==========================================
+# PRECOMPRESSED SIBLINGS (post-build stage)
+# ==========================================
+# Writes index.html.gz / .br (and the same for the published maps, the
+# theme stylesheets and the match snapshot) next to each artifact, so servers hand out the
+# compressed bytes instead of compressing on every request
+# (server/cms_server.py does, as do nginx gzip_static / brotli_static).
+# Only files whose content hash changed since the last run are recompressed.
+# Output is deterministic (gzip mtime=0), so an unchanged page never
+# changes its .gz in git. Siblings whose source is gone (e.g. expired match
+# pages) are deleted.
+RECORD_PATH = 'assets/data/cache/precompress.json'
+MANIFEST_PATH = 'assets/data/build_manifest.json'  # scripts/build_site.py: pages the builds own
+ASSET_TARGETS = ['assets/data/maps', 'assets/data/matches.json', 'assets/css']
+ASSET_SUFFIXES = ('.json', '.css')
+WATCH_DIR = 'watch'  # scripts/match_snapshot.py: watch/<match-id>/index.html
+SKIP_DIRS = {'.git', '.github', 'admin', 'server', 'core', 'scripts', 'data', '_debug', '__pycache__', 'node_modules', 'assets'}
+MIN_SIZE = 512  # Smaller files aren't worth a second request path
+GZIP_LEVEL = int(os.environ.get('PRECOMPRESS_GZIP_LEVEL', 9))
+BROTLI_QUALITY = int(os.environ.get('PRECOMPRESS_BROTLI_QUALITY', 11))
+WORKERS = int(os.environ.get('PRECOMPRESS_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+ENCODERS = [('gz', _gzip)] + ([('br', _brotli)] if brotli else [])
+EXTENSIONS = ('gz', 'br')
+
+
+def _built_pages(root):
+    """
+    Pages the build manifest (plus the not yet deployed pending list) records, or None without a manifest.
+    """
+    try:
+        with open(os.path.join(root, MANIFEST_PATH), 'r', encoding='utf-8') as f:
+            keys = set(json.load(f).get('pages', {}))
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return None
+    keys.update(pending_outputs(root) or [])
+    return sorted(k for k in keys if k.endswith('.html') and os.path.isfile(os.path.join(root, k)))
+
+
+def collect_targets(root='.'):
+    """
+    Relative paths of every built page plus the published maps, stylesheets and snapshot.
+    Pages come from the build manifest, so stale pages no build owns get no siblings
+    (they would never be deployed); without a manifest every index.html counts.
+    """
+    targets = _built_pages(root)
+    if targets is None:
+        targets = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath == root: dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            if 'index.html' in filenames:
+                targets.append(os.path.relpath(os.path.join(dirpath, 'index.html'), root))
+    for target in ASSET_TARGETS:
+        path = os.path.join(root, target)
+        if os.path.isdir(path):
+            targets += [os.path.join(target, f) for f in sorted(os.listdir(path)) if f.endswith(ASSET_SUFFIXES)]
+        elif os.path.isfile(path):
+            targets.append(target)
+    return [t.replace(os.sep, '/') for t in targets]
+
+
+def _write(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def compress_file(path, data):
+    """
+    Writes each sibling that is actually smaller than `data` (none below
+    MIN_SIZE) and removes the others, including those of an encoder missing
+    on this machine (a stale .br would be served first). Returns {ext: compressed_size}.
+    """
+    sizes = {}
+    encoders = dict(ENCODERS)
+    for ext in EXTENSIONS:
+        encode = encoders.get(ext)
+        blob = encode(data) if encode and len(data) >= MIN_SIZE else data
+        sibling = f"{path}.{ext}"
+        if len(blob) < len(data):
+            _write(sibling, blob)
+            sizes[ext] = len(blob)
+        elif os.path.exists(sibling):
+            os.remove(sibling)
+    return sizes
+
+
+def _sibling_dirs(root):
+    for dirpath, dirnames, _ in os.walk(root):
+        if dirpath == root: dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        yield dirpath
+    for target in ASSET_TARGETS:
+        path = os.path.join(root, target)
+        yield path if os.path.isdir(path) else os.path.dirname(path)
+
+
+def remove_orphans(root='.'):
+    """
+    Deletes .gz / .br siblings whose source file no longer exists.
+    """
+    removed = 0
+    watch_dir = os.path.normpath(os.path.join(root, WATCH_DIR))
+    for d in set(_sibling_dirs(root)):
+        if not os.path.isdir(d): continue
+        for f in os.listdir(d):
+            base, _, ext = f.rpartition('.')
+            if ext in EXTENSIONS and base.endswith(('.html',) + ASSET_SUFFIXES) and not os.path.exists(os.path.join(d, base)):
+                os.remove(os.path.join(d, f))
+                removed += 1
+        # An expired match page's folder (nothing else: other empty dirs may be wanted)
+        if os.path.normpath(os.path.dirname(d)) == watch_dir and not os.listdir(d): os.rmdir(d)
+    return removed
+
+
+def precompress(root='.', record_path=RECORD_PATH, force=False, workers=WORKERS):
+    """
+    Brings every target's siblings up to date. Returns the list of recompressed paths.
+    """
+    record_file = os.path.join(root, record_path)
+    try:
+        with open(record_file, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        record = {}
+    encodings = [ext for ext, _ in ENCODERS]
+
+    def work(rel):
+        path = os.path.join(root, rel)
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+        entry = record.get(rel)
+        if (not force and entry and entry.get('hash') == digest and entry.get('encodings') == encodings
+                and all(os.path.exists(f"{path}.{ext}") for ext in entry.get('sizes', {}))):
+            return rel, entry, False
+        sizes = compress_file(path, data)
+        return rel, {'hash': digest, 'encodings': encodings, 'size': len(data), 'sizes': sizes}, True
+
+    instrument.mark('compress')
+    targets = collect_targets(root)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:  # zlib / brotli release the GIL
+        results = list(ex.map(work, targets))
+
+    new_record = {rel: entry for rel, entry, _ in results}
+    changed = [rel for rel, _, redone in results if redone]
+    instrument.add('files_compressed', len(changed))
+    instrument.mark('orphans')
+    removed = remove_orphans(root)
+    if changed or removed or new_record != record:
+        os.makedirs(os.path.dirname(record_file), exist_ok=True)
+        with open(record_file, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(new_record.items())), f, indent=0)
+
+    raw = sum(e['size'] for e in new_record.values())
+    print(f"🗜️ Precompress: {len(changed)} recompressed, {len(targets) - len(changed)} unchanged, {removed} orphans removed"
+          + ("" if brotli else " (brotli not installed: .gz only)"))
+    for ext in encodings:
+        packed = sum(e['sizes'].get(ext, e['size']) for e in new_record.values())
+        if raw: print(f"   .{ext}: {raw / 1048576:.1f} MB -> {packed / 1048576:.1f} MB ({packed / raw:.0%})")
+    return changed
+
+
+if __name__ == "__main__":
+    instrument.start('precompress')
+    precompress(force='--force' in sys.argv[1:])
+    instrument.finish()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# ==========================================
+# ON-DISK RESPONSE CACHE
+# ==========================================
+# One small JSON file per key: the (trimmed) payload plus the validators
+# needed to revalidate it.
+#   - Younger than `ttl` seconds        -> served from disk, no request.
+#   - Older: conditional GET (ETag / Last-Modified). 304 -> keep payload.
+#   - 200 with the same payload hash   -> reported as unchanged.
+# The cache directory is committed with the assets, so it survives CI runs.
+# A revalidation that finds nothing new does not touch the entry: "fetched_at"
+# is when the payload last changed, so the committed files only change with
+# their content. When each key was last checked (what `ttl` counts from) goes
+# to a sidecar, CHECKED_NAME, which is gitignored; CI keeps it with
+# actions/cache (update_assets.yml).
+CHECKED_NAME = '.checked.json'
+
+
+class ResponseCache:
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self.checked_path = os.path.join(directory, CHECKED_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.checked_path, 'r', encoding='utf-8') as f:
+                self.checked = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.checked = {}
+
+    def _mark_checked(self, key, now):
+        with self._lock:
+            self.checked[key] = now
+            tmp = f"{self.checked_path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.checked, f, indent=0, sort_keys=True)
+            os.replace(tmp, self.checked_path)
+
+    def _path(self, key):
+        safe = "".join(c if c.isalnum() or c in '-_' else '_' for c in key)
+        return os.path.join(self.directory, f"{safe}.json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def store(self, key, entry):
+        path = self._path(key)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    def get_json(self, session, url, key, trim=None, limiter=None, headers=None, timeout=10):
+        """
+        Returns (payload, state) with state one of 'cached', 'not-modified',
+        'unchanged', 'updated'. `trim` reduces the decoded JSON to what the
+        caller needs before it is stored. Network errors propagate.
+        """
+        entry = self.load(key)
+        now = time.time()
+        checked = max(entry.get('fetched_at', 0), self.checked.get(key, 0)) if entry else 0
+        if entry and entry.get('url') == url and now - checked < self.ttl:
+            return entry['payload'], 'cached'
+
+        req_headers = dict(headers or {})
+        if entry and entry.get('url') == url:
+            if entry.get('etag'): req_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'): req_headers['If-Modified-Since'] = entry['last_modified']
+
+        if limiter: limiter.acquire()
+        resp = session.get(url, headers=req_headers, timeout=timeout)
+        if resp.status_code == 304 and entry:
+            self._mark_checked(key, now)
+            return entry['payload'], 'not-modified'
+        resp.raise_for_status()
+
+        data = resp.json()
+        payload = trim(data) if trim else data
+        digest = hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+        if entry and entry.get('url') == url and entry.get('hash') == digest:
+            self._mark_checked(key, now)
+            return entry['payload'], 'unchanged'
+        self.store(key, {
+            'url': url,
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'fetched_at': now,
+            'hash': digest,
+            'payload': payload,
+        })
+        return payload, 'updated'
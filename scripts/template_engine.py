@@ -0,0 +1,93 @@
+import re
+from functools import lru_cache
+
+# ==========================================
+# COMPILED TEMPLATES
+# ==========================================
+# A template is split ONCE into literal text and named slots. Rendering is a
+# single join over a context dict instead of one full-string copy per
+# html.replace() call.
+#
+# Slots come in two flavours:
+#   1. Placeholders: "{{NAME}}". Missing keys are left untouched ("{{NAME}}"),
+#      exactly like a replace() that never ran.
+#   2. Markers: named literal strings / regexes (e.g. '</head>'). Missing keys
+#      fall back to the original marker text (placeholders inside it are
+#      still rendered).
+PLACEHOLDER_RE = re.compile(r'\{\{([A-Z0-9_]+)\}\}')
+
+
+class CompiledTemplate:
+    def __init__(self, text, markers=None):
+        self.source = text
+        self.segments = []  # str literal | (key, fallback)
+        self.keys = set()
+        self._tokenize(text, markers or {})
+
+    def _tokenize(self, text, markers):
+        # 1. Locate markers (literal strings or compiled regexes)
+        spans = []
+        for name, pattern in markers.items():
+            if isinstance(pattern, str):
+                pattern = re.compile(re.escape(pattern))
+            for m in pattern.finditer(text):
+                spans.append((m.start(), m.end(), name))
+        spans.sort()
+
+        # 2. Split: marker spans become slots, the gaps are scanned for placeholders
+        pos = 0
+        for start, end, name in spans:
+            if start < pos: continue  # Overlapping marker, first one wins
+            self._add_placeholders(text[pos:start])
+            self.segments.append((name, CompiledTemplate(text[start:end])))
+            self.keys.add(name)
+            pos = end
+        self._add_placeholders(text[pos:])
+
+    def _add_placeholders(self, text):
+        pos = 0
+        for m in PLACEHOLDER_RE.finditer(text):
+            if m.start() > pos: self.segments.append(text[pos:m.start()])
+            self.segments.append((m.group(1), None))
+            self.keys.add(m.group(1))
+            pos = m.end()
+        if pos < len(text): self.segments.append(text[pos:])
+
+    def slot(self, name):
+        """
+        The compiled marker text behind slot `name` (first occurrence), or None.
+        """
+        for seg in self.segments:
+            if seg.__class__ is not str and seg[0] == name and seg[1] is not None:
+                return seg[1]
+        return None
+
+    def render(self, context):
+        out = []
+        for seg in self.segments:
+            if seg.__class__ is str:
+                out.append(seg)
+                continue
+            key, fallback = seg
+            if key in context:
+                val = context[key]
+                out.append(val if isinstance(val, str) else str(val))
+            elif fallback is not None:
+                out.append(fallback.render(context))
+            else:
+                out.append(f"{{{{{key}}}}}")
+        return ''.join(out)
+
+
+@lru_cache(maxsize=32)
+def _compile_cached(text, marker_items):
+    return CompiledTemplate(text, dict(marker_items))
+
+
+def compile_template(text, markers=None):
+    """
+    Returns a CompiledTemplate for `text`, memoized so each template is
+    tokenized once per build no matter how many pages use it.
+    """
+    if isinstance(text, CompiledTemplate): return text
+    return _compile_cached(text, tuple(sorted((markers or {}).items(), key=lambda x: x[0])))
@@ -0,0 +1,148 @@
+import glob
+import hashlib
+import os
+import re
+
+# ==========================================
+# SHARED, CONTENT-HASHED THEME STYLESHEETS
+# ==========================================
+# Every template carries one big <style> block filled with ~160 THEME_*
+# values. Inlined, that is 15-40 KB of near-identical CSS in every page.
+# build_site.py renders the block once per page as before, but publishes it
+# as assets/css/theme.<hash>.css and links it instead. The file name is the
+# hash of the rendered CSS, so pages sharing a resolved theme (theme,
+# theme_league, theme_page, theme_watch) share one cached file, and a theme
+# edit produces a new name instead of a stale cache.
+#
+# Modes (build_site.py --theme-css):
+#   external: <link rel="stylesheet"> only (default)
+#   critical: above-the-fold rules inlined, the full file loaded async
+#   inline:   the old <style> block, unchanged
+CSS_DIR = 'assets/css'
+CSS_URL = '/assets/css'
+MODES = ('external', 'critical', 'inline')
+SLOT = 'THEME_CSS'
+
+# The big block: "<style>" on its own line (the one-liner scroll-behavior tag is left alone)
+STYLE_BLOCK = re.compile(r'<style>[ \t]*\n.*?</style>', re.DOTALL)
+HREF_RE = re.compile(r'/assets/css/(theme\.[0-9a-f]+\.css)')
+
+# Selectors painted before the first scroll: base, header, hero, skeletons, layout shells
+CRITICAL_SELECTORS = (
+    ':root', '*', 'html', 'body', 'a', 'button', 'ul', 'h1', 'header',
+    '.header-container', '.h-layout-', '.logo-', '.nav-links', '.hamburger', '.mobile-menu',
+    '.hero-', '.entity-intro', '.sys-status', '.cat-scroll', '.cat-pill', '.static-h1',
+    '.skeleton', '.sk-', '.container', '.watch-container', '.layout-', '.sidebar-', '.hidden-load',
+)
+_CRITICAL_RE = re.compile('|'.join(
+    re.escape(p) + ('' if p.endswith('-') else r'(?![\w-])') for p in sorted(CRITICAL_SELECTORS, key=len, reverse=True)))
+
+
+def strip_style_tags(block):
+    return block[block.index('>') + 1:block.rindex('</style>')].strip('\n')
+
+
+def split_rules(css):
+    """
+    Top-level (prelude, body) pairs; comments are dropped.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    rules, depth, start, prelude = [], 0, 0, ''
+    for i, c in enumerate(css):
+        if c == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:i]))
+                start = i + 1
+    return rules
+
+
+def _is_critical(prelude):
+    return any(_CRITICAL_RE.match(sel.strip()) for sel in prelude.split(','))
+
+
+def critical_subset(css):
+    """
+    The rules (and @media blocks, filtered the same way) that style the
+    first screen. @keyframes etc. stay in the full file.
+    """
+    out = []
+    for prelude, body in split_rules(css):
+        if prelude.startswith('@media'):
+            inner = ''.join(f"{p}{{{b.strip()}}}" for p, b in split_rules(body) if _is_critical(p))
+            if inner: out.append(f"{prelude}{{{inner}}}")
+        elif not prelude.startswith('@') and _is_critical(prelude):
+            out.append(f"{prelude}{{{' '.join(body.split())}}}")
+    return '\n'.join(out)
+
+
+def publish(css, out_dir=CSS_DIR, url_base=CSS_URL):
+    """
+    Writes theme.<hash>.css unless it already exists. Returns its URL.
+    Safe to call from several worker processes at once.
+    """
+    data = css.encode('utf-8')
+    name = f"theme.{hashlib.sha1(data).hexdigest()[:10]}.css"
+    path = os.path.join(out_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(out_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return f"{url_base}/{name}"
+
+
+def stylesheet_tags(block, mode='external'):
+    """
+    What replaces the rendered <style> block in a page for `mode`.
+    """
+    if mode == 'inline': return block
+    css = strip_style_tags(block)
+    href = publish(css)
+    if mode == 'critical':
+        return (f"<style>{critical_subset(css)}</style>\n"
+                f'    <link rel="preload" as="style" href="{href}" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+                f'    <noscript><link rel="stylesheet" href="{href}"></noscript>')
+    return f'<link rel="stylesheet" href="{href}">'
+
+
+def linked(pages):
+    """
+    {stylesheet name: number of `pages` (output paths) linking it}.
+    """
+    counts = {}
+    for path in pages:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for name in set(HREF_RE.findall(f.read())):
+                    counts[name] = counts.get(name, 0) + 1
+        except OSError:
+            continue
+    return counts
+
+
+def collect_garbage(used, out_dir=CSS_DIR):
+    """
+    Deletes stylesheets whose name is not in `used`. Returns their names.
+    """
+    removed = []
+    for path in glob.glob(os.path.join(out_dir, 'theme.*.css')):
+        if os.path.basename(path) not in used:
+            os.remove(path)
+            removed.append(os.path.basename(path))
+    return removed
+
+
+def report(counts, removed=(), out_dir=CSS_DIR):
+    if not counts: return
+    note = f", {len(removed)} stale removed" if removed else ""
+    print(f"🎨 Theme CSS: {len(counts)} shared stylesheets{note}")
+    for name, n in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
+        path = os.path.join(out_dir, name)
+        size = os.path.getsize(path) / 1024 if os.path.exists(path) else 0
+        print(f"   -> {name}: {size:.1f} KB, linked by {n} pages (-{size * (n - 1):.0f} KB vs inlining)")